@@ -1,24 +1,35 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud, models, schemas
-from .database import get_db
-from .security import verify_password
+from . import crud_async
+from .database import get_async_db
+from .permissions import get_role_mask, permission_bit
+from .principal import Principal, principal_cache
 
 # --- Security Settings --- #
 
 SECRET_KEY = "your-super-secret-key-that-is-long-and-random"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# When enabled, tokens carry the staff id, role id and permission mask so that read
+# routes only need a primary key lookup of the staff member, not the role join.
+EMBED_PERMISSIONS_IN_TOKEN = os.getenv("EMBED_PERMISSIONS_IN_TOKEN", "0") == "1"
+# Methods whose routes may authorize from the embedded claims; writes always reload the staff member
+CLAIMS_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
 # --- OAuth2 Scheme --- #
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# For routes browsers open without custom headers (EventSource); see get_current_user_from_request
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+# Query parameter and cookie such routes also read the access token from
+ACCESS_TOKEN_PARAM = "access_token"
 
 # --- JWT Token Handling --- #
 
@@ -28,47 +39,108 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_claims_for(principal: Principal) -> dict:
+    """Builds the claims for a staff member's access token."""
+    claims = {"sub": principal.email, "role": principal.role_name}
+    if EMBED_PERMISSIONS_IN_TOKEN:
+        claims.update({"uid": principal.id, "rid": principal.role_id, "pm": principal.permission_mask})
+    return claims
+
+def _principal_from_claims(email: str, payload: dict) -> Principal:
+    # Prefer the role's current compiled mask so role changes apply before the token expires.
+    # Deleted roles compile to 0; roles this worker has not loaded yet (created on another
+    # worker since the last ROLE_MASK_REFRESH_SECONDS reload) fall back to the token's mask.
+    role_id = payload.get("rid")
+    mask = get_role_mask(role_id) if role_id is not None else None
+    return Principal(
+        id=payload["uid"],
+        email=email,
+        role_id=role_id,
+        role_name=payload.get("role"),
+        permission_mask=payload["pm"] if mask is None else mask,
+    )
+
 # --- User Dependency --- #
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> 'models.staff.Staff':
-    """Decodes JWT token to get current user."""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def principal_from_token(token: str, db: AsyncSession, use_claims: bool = False) -> Principal:
+    """
+    Decodes a JWT access token into its principal, served from the principal cache
+    when possible. With use_claims (read routes only), a token carrying embedded
+    permissions is checked against the staff member's current role id instead of
+    loading their role and permissions; a deleted staff member or a changed role
+    fails the check.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
-    user = crud.get_staff_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+
+    use_claims = use_claims and EMBED_PERMISSIONS_IN_TOKEN and "pm" in payload and "uid" in payload
+    # Claims-built principals are cached apart, so write routes never pick them up
+    cache_key = (email, payload.get("iat"), use_claims)
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    if use_claims:
+        staff = await crud_async.get_staff_role_id(db, payload["uid"], email)
+        if staff is None or staff.role_id != payload.get("rid"):
+            raise _credentials_exception()
+        principal = _principal_from_claims(email, payload)
+    else:
+        user = await crud_async.get_staff_by_email(db, email=email)
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_staff(user)
+    principal_cache.set(cache_key, principal)
+    return principal
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """Decodes JWT token to get current user, served from the principal cache when possible."""
+    return await principal_from_token(token, db, use_claims=request.method in CLAIMS_METHODS)
+
+async def get_current_user_from_request(
+    request: Request,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Like get_current_user, for routes opened by browser APIs that cannot set an
+    Authorization header, such as EventSource: the token may instead be passed as
+    the `access_token` query parameter or cookie. The header wins when present.
+    """
+    token = token or request.query_params.get(ACCESS_TOKEN_PARAM) or request.cookies.get(ACCESS_TOKEN_PARAM)
+    if not token:
+        raise _credentials_exception()
+    return await principal_from_token(token, db, use_claims=request.method in CLAIMS_METHODS)
 
 def has_permission(required_permission: str):
     """FastAPI dependency to check if the current user has the required permission."""
-    def permission_checker(current_user: models.staff.Staff = Depends(get_current_user), db: Session = Depends(get_db)) -> bool:
-        # The user's role is accessed via the relationship
-        user_role = current_user.role
-        if not user_role:
-            raise HTTPException(status_code=403, detail="User has no assigned role.")
+    required_bit = permission_bit(required_permission)
 
-        # Check if any permission for this role matches the required one
-        has_perm = any(
-            link.permission.name == required_permission
-            for link in user_role.permissions
-        )
+    async def permission_checker(current_user: Principal = Depends(get_current_user)) -> bool:
+        if current_user.role_name is None:
+            raise HTTPException(status_code=403, detail="User has no assigned role.")
 
-        if not has_perm:
+        if not current_user.permission_mask & required_bit:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"You do not have the '{required_permission}' permission."
@@ -0,0 +1,112 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# --- Free-Bed Index --- #
+
+class _Room:
+    """Beds of one room, each owning a bit position; a set bit means the bed is free."""
+
+    __slots__ = ("bed_ids", "positions", "free_bits")
+
+    def __init__(self):
+        self.bed_ids: List[Optional[int]] = []
+        self.positions: Dict[int, int] = {}
+        self.free_bits = 0
+
+
+class BedIndex:
+    """
+    A compact in-process index of free beds, one bitmap per room.
+
+    The index only proposes candidates; the beds table remains the source of
+    truth and every allocation is confirmed with a locking SELECT. A stale
+    index (e.g. after another worker allocated a bed) costs one extra query
+    and triggers a resync, never a double allocation.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, _Room] = {}
+        self._bed_rooms: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Tuple[int, str, bool]], room_number: Optional[str] = None) -> None:
+        """Replaces the index (or one room of it) with (bed id, room, is_occupied) rows."""
+        with self._lock:
+            if room_number is None:
+                self._rooms.clear()
+                self._bed_rooms.clear()
+            else:
+                room = self._rooms.pop(room_number, None)
+                for bed_id in room.positions if room else ():
+                    self._bed_rooms.pop(bed_id, None)
+            for bed_id, room_name, is_occupied in rows:
+                self._set(bed_id, room_name, not is_occupied)
+
+    def set_bed(self, bed_id: int, room_number: str, is_free: bool) -> None:
+        with self._lock:
+            self._set(bed_id, room_number, is_free)
+
+    def remove_bed(self, bed_id: int) -> None:
+        with self._lock:
+            self._remove(bed_id)
+
+    def free_candidates(self, room_number: Optional[str] = None, limit: int = 8) -> List[int]:
+        """Returns up to `limit` bed ids the index believes are free."""
+        with self._lock:
+            rooms = [self._rooms.get(room_number)] if room_number is not None else list(self._rooms.values())
+            candidates = []
+            for room in rooms:
+                bits = room.free_bits if room else 0
+                while bits and len(candidates) < limit:
+                    lowest = bits & -bits
+                    candidates.append(room.bed_ids[lowest.bit_length() - 1])
+                    bits ^= lowest
+                if len(candidates) >= limit:
+                    break
+            return candidates
+
+    def free_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: bin(room.free_bits).count("1") for name, room in self._rooms.items()}
+
+    def _set(self, bed_id: int, room_number: str, is_free: bool) -> None:
+        if self._bed_rooms.get(bed_id) not in (None, room_number):
+            self._remove(bed_id)
+        room = self._rooms.get(room_number)
+        if room is None:
+            room = self._rooms[room_number] = _Room()
+        position = room.positions.get(bed_id)
+        if position is None:
+            position = room.positions[bed_id] = len(room.bed_ids)
+            room.bed_ids.append(bed_id)
+        self._bed_rooms[bed_id] = room_number
+        if is_free:
+            room.free_bits |= 1 << position
+        else:
+            room.free_bits &= ~(1 << position)
+
+    def _remove(self, bed_id: int) -> None:
+        room_number = self._bed_rooms.pop(bed_id, None)
+        room = self._rooms.get(room_number)
+        if room is None:
+            return
+        position = room.positions.pop(bed_id)
+        room.bed_ids[position] = None
+        room.free_bits &= ~(1 << position)
+
+
+bed_index = BedIndex()
+
+
+def load_bed_index(db: Session, room_number: Optional[str] = None) -> None:
+    """(Re)builds the free-bed index from the beds table, for one room or all of them."""
+    bed = models.bed.Bed
+    query = select(bed.id, bed.room_number, bed.is_occupied)
+    if room_number is not None:
+        query = query.where(bed.room_number == room_number)
+    bed_index.load(db.execute(query).all(), room_number=room_number)
@@ -0,0 +1,235 @@
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from pydantic import BaseModel
+
+# --- In-Process Caching --- #
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A small thread-safe LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        return {"size": size, "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+# --- Read-Through Caching --- #
+
+class CacheBackend:
+    """
+    A store shared by every worker (e.g. Redis) behind a ReadThroughCache.
+    Values are opaque bytes; counters hold cache generations.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """An in-process stand-in for a shared backend, for development and single-worker deployments."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: dict = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, None))
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, self._clock() + ttl)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value, _ = self._data.get(key, (b"0", None))
+            value = str(int(value) + 1).encode()
+            self._data[key] = (value, None)
+            return int(value)
+
+
+class RedisCacheBackend(CacheBackend):
+    """A shared backend on Redis, through the optional redis package."""
+
+    def __init__(self, url: str):
+        import redis.asyncio
+        self._client = redis.asyncio.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+
+def _key_part(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_key_part(item) for item in value]
+    return value
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+class ReadThroughCache:
+    """
+    Caches the results of async read functions, in an in-process LRU with a TTL
+    and, when a backend is given, in a store shared by every worker.
+    Writers call `invalidate()` after committing. It moves the cache to a new
+    generation instead of deleting keys, so every cached read, whatever its
+    arguments, is dropped at once. With a backend the generation lives there,
+    so a write in one worker invalidates all of them; without one, other
+    workers serve their copy for up to the TTL, except to reads keyed to a
+    table version (see `cached`).
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.backend = backend
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self.shared_hits = 0
+        self.invalidations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        self._served = 0
+
+    async def _current_generation(self) -> int:
+        if self.backend is None:
+            return self._generation
+        value = await self.backend.get(f"{self.name}:generation")
+        return int(value) if value is not None else 0
+
+    def _record_age(self, stored_at: float) -> None:
+        age = max(time.time() - stored_at, 0.0)
+        self._served += 1
+        self._served_age_total += age
+        self._served_age_max = max(self._served_age_max, age)
+
+    async def get_or_load(self, key: str, load: Callable[[], Any]) -> Any:
+        # The generation is read before loading, so a result racing a write is stored under the old one
+        generation = await self._current_generation()
+        entry = self._local.get((generation, key))
+        if entry is not None:
+            self._record_age(entry[0])
+            return entry[1]
+        shared_key = f"{self.name}:{generation}:{key}"
+        if self.backend is not None:
+            payload = await self.backend.get(shared_key)
+            if payload is not None:
+                stored_at, value = json.loads(payload)
+                self.shared_hits += 1
+                self._record_age(stored_at)
+                self._local.set((generation, key), (stored_at, value))
+                return value
+        value = await load()
+        stored_at = time.time()
+        self._local.set((generation, key), (stored_at, value))
+        if self.backend is not None:
+            await self.backend.set(shared_key, json.dumps([stored_at, _jsonable(value)], default=str).encode(), self._local.ttl)
+        return value
+
+    def cached(self, fn: Callable) -> Callable:
+        """
+        Wraps an async crud function taking (db, **kwargs); the kwargs form the cache key.
+        Callers that advertise a table version, e.g. in an ETag, pass it as `version`:
+        it joins the key without reaching `fn`, so a result this worker cached before
+        another worker's write is never served under the newer version.
+        """
+        @functools.wraps(fn)
+        async def wrapper(db, version: Optional[Any] = None, **kwargs):
+            key = fn.__name__ + ":" + json.dumps(_key_part(kwargs), sort_keys=True, default=str)
+            if version is not None:
+                key += f"@{version}"
+            return await self.get_or_load(key, lambda: fn(db, **kwargs))
+        return wrapper
+
+    async def invalidate(self) -> None:
+        self.invalidations += 1
+        if self.backend is None:
+            self._generation += 1
+        else:
+            await self.backend.incr(f"{self.name}:generation")
+        self._local.clear()
+
+    def stats(self) -> dict:
+        local = self._local.stats()
+        lookups = local["hits"] + local["misses"]
+        hits = local["hits"] + self.shared_hits
+        return {
+            **local,
+            "shared": type(self.backend).__name__ if self.backend is not None else None,
+            "shared_hits": self.shared_hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            # Age of the cached results served, i.e. how stale they could be
+            "served_age_avg_seconds": round(self._served_age_total / self._served, 3) if self._served else None,
+            "served_age_max_seconds": round(self._served_age_max, 3),
+        }
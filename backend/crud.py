@@ -1,100 +1,509 @@
+import csv
+import datetime
+import io
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Date, Float, case, cast, delete, func, insert, literal, literal_column, null, or_, select, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 
 from . import models
+from .models.invoice import UNPAID_INVOICE_STATUSES
+from .models.invoice_rollup import InvoiceDailyRollup, PatientBalance
+from .models.patient import SEARCH_COLUMNS
+from .models.table_version import TableVersion
+from .models.versioning import Tombstone
+from .models.stock_movement import ADJUSTMENT, DISPENSE, RESTOCK
 from .schemas.patient import PatientCreate
-from .schemas.appointment import AppointmentCreate
-from .schemas.bed import BedCreate, BedUpdate
+from .schemas.appointment import AppointmentCreate, AppointmentFilter
+from .schemas.bed import BedCreate, BedFilter, BedUpdate
 from .schemas.staff import StaffCreate
 from .schemas.role import RoleCreate, RoleUpdate
-from .schemas.invoice import InvoiceCreate, InvoiceUpdate
-from .schemas.medicine import MedicineCreate, MedicineUpdate, MedicineRestock
-from .schemas.dispensation import DispensationCreate
+from .schemas.invoice import InvoiceCreate, InvoiceFilter, InvoiceUpdate
+from .schemas.medicine import MedicineCreate, MedicineFilter, MedicineUpdate, MedicineRestock, MedicineAdjust
+from .schemas.dispensation import DispensationCreate, DispensationFilter
+from .schemas.listing import ListFilter
+from .bed_allocator import bed_index, load_bed_index
+from .events import PUSH_COLUMNS, change_event, emit
+from .exceptions import (
+    DispensationBatchError,
+    InsufficientStockError,
+    MedicineNotFoundError,
+    NoBedAvailableError,
+    PatientAlreadyAdmittedError,
+)
+from .pagination import decode_sync_token, encode_sync_token, paginate
+from .permissions import forget_role, refresh_role_mask
+from .principal import principal_cache
+from .scheduling import ensure_no_conflict, get_availability
 from .security import get_password_hash
 
-# ... (Patient, Appointment, Bed CRUD functions remain the same) ...
+# --- Eager Loading --- #
+
+# Loader options matching the nested fields of each response schema, so that
+# serializing a page of rows never falls back to per-row lazy loads.
+APPOINTMENT_LOADERS = (joinedload(models.appointment.Appointment.patient),)
+BED_LOADERS = (joinedload(models.bed.Bed.patient),)
+STAFF_LOADERS = (joinedload(models.staff.Staff.role),)
+INVOICE_LOADERS = (joinedload(models.invoice.Invoice.patient),)
+DISPENSATION_LOADERS = (
+    joinedload(models.dispensation.Dispensation.staff).joinedload(models.staff.Staff.role),
+    joinedload(models.dispensation.Dispensation.patient),
+    joinedload(models.dispensation.Dispensation.medicine),
+)
+
+def _reload(db: Session, model, obj_id: int, loaders):
+    """Re-reads a written row together with the relationships its response needs, in one query."""
+    return db.query(model).options(*loaders).populate_existing().filter(model.id == obj_id).one()
+
+# --- Filtered Listings --- #
+
+def _filter_conditions(model, filters: ListFilter):
+    """Translates the set fields of a filter schema into WHERE conditions (see ListFilter)."""
+    conditions = []
+    for name, value in filters.model_dump(exclude_none=True, exclude={"sort", "order"}).items():
+        if name.endswith("_from"):
+            conditions.append(getattr(model, name[:-len("_from")]) >= value)
+        elif name.endswith("_to"):
+            conditions.append(getattr(model, name[:-len("_to")]) < value)
+        elif name.endswith("_max"):
+            conditions.append(getattr(model, name[:-len("_max")]) <= value)
+        elif name.endswith("_prefix"):
+            # The pattern is bound whole, not concatenated in SQL, so the planner sees a constant prefix
+            escaped = value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+            conditions.append(getattr(model, name[:-len("_prefix")]).like(escaped + "%", escape="/"))
+        else:
+            conditions.append(getattr(model, name) == value)
+    return conditions
+
+def _list(db: Session, model, loaders, filters: Optional[ListFilter], skip: int, limit: int, cursor: Optional[str]):
+    """One page of a filtered, sorted listing, keyset-paginated over (sort column, id)."""
+    query = db.query(model).options(*loaders)
+    if filters is None:
+        return paginate(query, (model.id,), skip=skip, limit=limit, cursor=cursor).all()
+    query = query.filter(*_filter_conditions(model, filters))
+    keys = tuple(getattr(model, name) for name in filters.cursor_keys())
+    return paginate(query, keys, skip=skip, limit=limit, cursor=cursor, descending=filters.order == "desc").all()
+
+# --- Point Lookups --- #
+
+def _get_one(db: Session, model, obj_id: int, loaders=()):
+    return db.query(model).options(*loaders).filter(model.id == obj_id).first()
+
+def _get_many(db: Session, model, ids: List[int], loaders=()):
+    """Fetches rows by id with one IN query, returned in the order of `ids`; unknown ids are skipped."""
+    if not ids:
+        return []
+    by_id = {row.id: row for row in db.query(model).options(*loaders).filter(model.id.in_(ids))}
+    return [by_id[obj_id] for obj_id in ids if obj_id in by_id]
+
+# --- Table Versions --- #
+
+# Tables whose rows carry a row_version, by name
+VERSIONED_MODELS = {
+    model.__tablename__: model
+    for model in (
+        models.appointment.Appointment, models.bed.Bed, models.dispensation.Dispensation, models.invoice.Invoice,
+        models.medicine.Medicine, models.patient.Patient, models.role.Role, models.staff.Staff,
+    )
+}
+
+def _upsert_add(db: Session, model, keys: dict, increments: dict, returning=()):
+    """Adds `increments` to the row identified by `keys`, inserting it when missing, in one statement."""
+    dialect_insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(model).values(**keys, **increments)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: getattr(model, name) + stmt.excluded[name] for name in increments},
+    )
+    if returning:
+        stmt = stmt.returning(*returning)
+    return db.execute(stmt)
+
+def _touch(db: Session, changed: Optional[Dict[str, Iterable[int]]] = None, deleted: Optional[Dict[str, Iterable[int]]] = None):
+    """
+    Stamps the rows changed by the current transaction with a new version and
+    records a tombstone for each deleted row. Both arguments map table names to
+    row ids. Writes to the tables in events.PUSH_COLUMNS are also emitted to push
+    subscribers. Called as the last statement before commit.
+    On PostgreSQL the version is the transaction id, which takes no lock, so
+    writers to one table still commit concurrently; readers only trust versions
+    below the oldest running transaction (see _synced_version). Elsewhere it is
+    a per-table counter whose row stays locked until commit, which costs nothing
+    on SQLite as it serializes writers anyway.
+    """
+    changed, deleted = changed or {}, deleted or {}
+    changes = []
+    txid = db.execute(select(func.txid_current())).scalar_one() if db.get_bind().dialect.name == "postgresql" else None
+    for table in sorted(set(changed) | set(deleted)):
+        if txid is not None:
+            version = txid
+        else:
+            version = _upsert_add(db, TableVersion, {"table_name": table}, {"version": 1}, (TableVersion.version,)).scalar_one()
+        row_ids = list(changed.get(table, ()))
+        if row_ids:
+            model = VERSIONED_MODELS[table]
+            stmt = update(model).where(model.id.in_(row_ids)).values(row_version=version)
+            if table in PUSH_COLUMNS:
+                # The pushed row state comes back from the same statement
+                stmt = stmt.returning(*(getattr(model, name) for name in PUSH_COLUMNS[table]))
+                rows = db.execute(stmt, execution_options={"synchronize_session": False}).mappings()
+                changes.extend(change_event(table, version, dict(row)) for row in rows)
+            else:
+                db.execute(stmt, execution_options={"synchronize_session": False})
+        row_ids = list(deleted.get(table, ()))
+        if row_ids:
+            db.execute(insert(Tombstone), [{"table_name": table, "row_id": row_id, "version": version} for row_id in row_ids])
+            if table in PUSH_COLUMNS:
+                changes.extend(change_event(table, version, deleted_id=row_id) for row_id in row_ids)
+    emit(db, changes)
+
+def _synced_version(db: Session) -> Optional[int]:
+    """
+    On PostgreSQL, the highest version no running transaction can still write:
+    one below the oldest transaction id in the current snapshot. Versions are
+    transaction ids there and commit out of order, so only versions up to this
+    one are final. None on other databases, whose counters commit in order.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    return db.execute(select(func.txid_snapshot_xmin(func.txid_current_snapshot()))).scalar_one() - 1
+
+def get_table_versions(db: Session, tables: List[str]) -> List[int]:
+    """
+    Current version of each table, in the order given; 0 for tables never written.
+    On PostgreSQL, the newest final row or tombstone version of the table (two
+    index lookups), which grows with every committed write: a write only becomes
+    final after every snapshot that could have missed it has moved past it.
+    """
+    synced = _synced_version(db)
+    if synced is None:
+        rows = db.execute(select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables)))
+        versions = dict(rows.all())
+        return [versions.get(table, 0) for table in tables]
+    columns = []
+    for table in tables:
+        model = VERSIONED_MODELS[table]
+        written = select(func.max(model.row_version)).where(model.row_version <= synced).scalar_subquery()
+        deleted = (
+            select(func.max(Tombstone.version))
+            .where(Tombstone.table_name == table, Tombstone.version <= synced)
+            .scalar_subquery()
+        )
+        columns.append(func.greatest(func.coalesce(written, 0), func.coalesce(deleted, 0)))
+    return list(db.execute(select(*columns)).one())
+
+def get_changes(db: Session, model, loaders=(), since: Optional[str] = None, limit: int = 100):
+    """
+    Rows of `model` written, and ids deleted, after the `since` token, oldest first.
+    Rows are ordered by (row_version, id) and the returned token is the position
+    reached: pass it back as `since` for the next batch. A batch may end inside
+    one write's rows, so a large transaction (or the rows never stamped since
+    versioning began, all at version 0) is paged like any other. Deletions are
+    sent once every row of their version has been.
+    """
+    table = model.__tablename__
+    version, after_id = decode_sync_token(since)
+    # Read the version before the rows: a write committing in between is sent again next time, never lost
+    current = _synced_version(db)
+    if current is None:
+        current = get_table_versions(db, [table])[0]
+    if current < version:
+        # A lagging replica; nothing past the client's position is visible yet
+        return {"changed": [], "deleted": [], "token": since, "has_more": False}
+    position = tuple_(model.row_version, model.id)
+    rows = (
+        db.query(model)
+        .options(*loaders)
+        .filter(model.row_version <= current)
+        .filter(model.row_version > version if after_id is None else position > tuple_(version, after_id))
+        .order_by(model.row_version, model.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        last = rows[-1]
+        token = encode_sync_token(last.row_version, last.id)
+        completed = last.row_version - 1
+    else:
+        token = encode_sync_token(current)
+        completed = current
+    deleted = db.scalars(
+        select(Tombstone.row_id)
+        .where(
+            Tombstone.table_name == table,
+            Tombstone.version > (version if after_id is None else version - 1),
+            Tombstone.version <= completed,
+        )
+        .order_by(Tombstone.version, Tombstone.id)
+    ).all()
+    return {"changed": rows, "deleted": deleted, "token": token, "has_more": has_more}
+
+# --- Single Round-Trip Writes --- #
+
+def _finish_write(db: Session, db_obj, relationships=(), changed=None, deleted=None):
+    if db_obj is None:
+        db.rollback()
+        return None
+    # Nested response fields are loaded before commit, from the identity map where possible
+    for name in relationships:
+        getattr(db_obj, name)
+    _touch(db, changed, deleted)
+    db.commit()
+    return db_obj
+
+def _update_returning(db: Session, model, obj_id: int, values: dict, relationships=()):
+    """
+    Updates one row with a single UPDATE ... RETURNING and returns the updated
+    entity built from the returned row, or None when no row matched.
+    """
+    if not values:
+        return _finish_write(db, db.get(model, obj_id), relationships)
+    stmt = update(model).where(model.id == obj_id).values(**values).returning(model)
+    return _finish_write(db, db.execute(stmt).scalars().first(), relationships, {model.__tablename__: [obj_id]})
+
+def _delete_returning(db: Session, model, obj_id: int, relationships=(), changed=None):
+    """
+    Deletes one row with a single DELETE ... RETURNING and returns the deleted
+    entity built from the returned row, or None when no row matched.
+    `changed` lists rows the caller modified alongside, e.g. detached children.
+    """
+    stmt = delete(model).where(model.id == obj_id).returning(model)
+    db_obj = db.execute(stmt, execution_options={"synchronize_session": False}).scalars().first()
+    return _finish_write(db, db_obj, relationships, changed, {model.__tablename__: [obj_id]})
 
 # Patient CRUD functions
-def get_patients(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.patient.Patient).offset(skip).limit(limit).all()
+def get_patients(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(models.patient.Patient), (models.patient.Patient.id,), skip=skip, limit=limit, cursor=cursor).all()
+
+def get_patient(db: Session, patient_id: int):
+    return _get_one(db, models.patient.Patient, patient_id)
+
+def get_patients_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.patient.Patient, ids)
+
+def get_patient_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.patient.Patient, (), since, limit)
 
 def delete_patient(db: Session, patient_id: int):
-    db_patient = db.query(models.patient.Patient).filter(models.patient.Patient.id == patient_id).first()
-    if db_patient:
-        db.delete(db_patient)
-        db.commit()
+    # Detach appointments and beds first, as the ORM delete used to
+    appointment = models.appointment.Appointment
+    bed = models.bed.Bed
+    appointment_ids = db.scalars(update(appointment).where(appointment.patient_id == patient_id).values(patient_id=None).returning(appointment.id)).all()
+    # A deleted patient's bed is free again, in the table and, once committed, in the free-bed index
+    freed = db.execute(update(bed).where(bed.patient_id == patient_id).values(patient_id=None, is_occupied=False).returning(bed.id, bed.room_number)).all()
+    db_patient = _delete_returning(db, models.patient.Patient, patient_id, changed={"appointments": appointment_ids, "beds": [row.id for row in freed]})
+    if db_patient is not None:
+        for bed_id, room_number in freed:
+            bed_index.set_bed(bed_id, room_number, True)
     return db_patient
 
 def update_patient(db: Session, patient_id: int, patient: PatientCreate):
-    db_patient = db.query(models.patient.Patient).filter(models.patient.Patient.id == patient_id).first()
-    if db_patient:
-        for key, value in patient.dict().items():
-            setattr(db_patient, key, value)
-        db.commit()
-        db.refresh(db_patient)
-    return db_patient
+    return _update_returning(db, models.patient.Patient, patient_id, patient.dict())
 
 def create_patient(db: Session, patient: PatientCreate):
     db_patient = models.patient.Patient(**patient.dict())
     db.add(db_patient)
+    db.flush()
+    _touch(db, {"patients": [db_patient.id]})
     db.commit()
     db.refresh(db_patient)
     return db_patient
 
+def get_existing_patient_keys(db: Session, emails: List[str], contact_numbers: List[str]):
+    """Returns which of the given emails and contact numbers are already taken, as two sets."""
+    patient = models.patient.Patient
+    taken_emails = set(db.scalars(select(patient.email).where(patient.email.in_(emails))))
+    taken_contacts = set(db.scalars(select(patient.contact_number).where(patient.contact_number.in_(contact_numbers))))
+    return taken_emails, taken_contacts
+
+BULK_PATIENT_COLUMNS = ("first_name", "last_name", "date_of_birth", "contact_number", "email")
+
+def bulk_insert_patients(db: Session, patients: List[PatientCreate]):
+    """
+    Inserts many validated patients and commits, with COPY on PostgreSQL (psycopg2)
+    and a single executemany INSERT elsewhere. A unique violation aborts the batch
+    with IntegrityError, leaving the caller to sort out the offending rows.
+    """
+    if not patients:
+        return
+    try:
+        if db.get_bind().dialect.driver == "psycopg2":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for patient in patients:
+                writer.writerow([getattr(patient, column) for column in BULK_PATIENT_COLUMNS])
+            buffer.seek(0)
+            statement = f"COPY patients ({', '.join(BULK_PATIENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+            cursor = db.connection().connection.cursor()
+            try:
+                cursor.copy_expert(statement, buffer)
+            except db.get_bind().dialect.dbapi.IntegrityError as exc:
+                # The raw DBAPI cursor bypasses SQLAlchemy's exception wrapping
+                raise IntegrityError(statement, None, exc)
+            finally:
+                cursor.close()
+        else:
+            db.execute(insert(models.patient.Patient), [patient.dict() for patient in patients])
+        # COPY reports no ids: find the new rows by their unique emails to stamp them
+        patient_model = models.patient.Patient
+        new_ids = db.scalars(select(patient_model.id).where(patient_model.email.in_([patient.email for patient in patients]))).all()
+        _touch(db, {"patients": new_ids})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def search_patients(db: Session, q: str, limit: int = 10):
+    """
+    Returns the top `limit` patients whose name, contact number or email match `q`.
+    PostgreSQL ranks prefix matches first, then trigram similarity, both served by
+    the pg_trgm indexes; other databases fall back to indexed prefix matching.
+    """
+    patient = models.patient.Patient
+    columns = [getattr(patient, name) for name in SEARCH_COLUMNS]
+    if db.get_bind().dialect.name == "postgresql":
+        prefix = or_(*(column.istartswith(q, autoescape=True) for column in columns))
+        similar = or_(*(column.op("%")(q) for column in columns))
+        score = func.greatest(*(func.similarity(column, q) for column in columns)) + case((prefix, 1.0), else_=0.0)
+        query = select(patient).where(or_(prefix, similar)).order_by(score.desc(), patient.id)
+    else:
+        exact = or_(*(column == q for column in columns))
+        query = (
+            select(patient)
+            .where(or_(*(column.startswith(q, autoescape=True) for column in columns)))
+            .order_by(case((exact, 0), else_=1), patient.last_name, patient.first_name, patient.id)
+        )
+    return db.execute(query.limit(limit)).scalars().all()
+
 # Appointment CRUD functions
-def get_appointments(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.appointment.Appointment).offset(skip).limit(limit).all()
+def get_appointments(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[AppointmentFilter] = None):
+    return _list(db, models.appointment.Appointment, APPOINTMENT_LOADERS, filters, skip, limit, cursor)
+
+def get_appointment(db: Session, appointment_id: int):
+    return _get_one(db, models.appointment.Appointment, appointment_id, APPOINTMENT_LOADERS)
+
+def get_appointments_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.appointment.Appointment, ids, APPOINTMENT_LOADERS)
+
+def get_appointment_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.appointment.Appointment, APPOINTMENT_LOADERS, since, limit)
 
 def create_appointment(db: Session, appointment: AppointmentCreate):
+    ensure_no_conflict(db, appointment.doctor_name, appointment.appointment_date, appointment.duration_minutes, appointment.status)
     db_appointment = models.appointment.Appointment(**appointment.dict())
     db.add(db_appointment)
+    db.flush()
+    appointment_id = db_appointment.id
+    _touch(db, {"appointments": [appointment_id]})
     db.commit()
-    db.refresh(db_appointment)
-    return db_appointment
+    return _reload(db, models.appointment.Appointment, appointment_id, APPOINTMENT_LOADERS)
 
 def update_appointment(db: Session, appointment_id: int, appointment: AppointmentCreate):
-    db_appointment = db.query(models.appointment.Appointment).filter(models.appointment.Appointment.id == appointment_id).first()
-    if db_appointment:
-        for key, value in appointment.dict().items():
-            setattr(db_appointment, key, value)
-        db.commit()
-        db.refresh(db_appointment)
-    return db_appointment
+    ensure_no_conflict(
+        db, appointment.doctor_name, appointment.appointment_date, appointment.duration_minutes,
+        appointment.status, exclude_id=appointment_id,
+    )
+    return _update_returning(db, models.appointment.Appointment, appointment_id, appointment.dict(), ("patient",))
+
+def get_doctor_availability(db: Session, doctor_name: str, start: datetime.datetime, end: datetime.datetime, min_minutes: int):
+    return [{"start": begins, "end": ends} for begins, ends in get_availability(db, doctor_name, start, end, min_minutes)]
 
 def delete_appointment(db: Session, appointment_id: int):
-    db_appointment = db.query(models.appointment.Appointment).filter(models.appointment.Appointment.id == appointment_id).first()
-    if db_appointment:
-        db.delete(db_appointment)
-        db.commit()
-    return db_appointment
+    return _delete_returning(db, models.appointment.Appointment, appointment_id, ("patient",))
 
 # Bed CRUD functions
-def get_beds(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.bed.Bed).offset(skip).limit(limit).all()
+def get_beds(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[BedFilter] = None):
+    return _list(db, models.bed.Bed, BED_LOADERS, filters, skip, limit, cursor)
+
+def get_bed(db: Session, bed_id: int):
+    return _get_one(db, models.bed.Bed, bed_id, BED_LOADERS)
+
+def get_beds_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.bed.Bed, ids, BED_LOADERS)
+
+def get_bed_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.bed.Bed, BED_LOADERS, since, limit)
+
+def _index_bed(db_bed):
+    if db_bed is not None:
+        bed_index.set_bed(db_bed.id, db_bed.room_number, not db_bed.is_occupied)
+    return db_bed
 
 def create_bed(db: Session, bed: BedCreate):
     db_bed = models.bed.Bed(**bed.dict())
     db.add(db_bed)
+    db.flush()
+    bed_id = db_bed.id
+    _touch(db, {"beds": [bed_id]})
     db.commit()
-    db.refresh(db_bed)
-    return db_bed
+    return _index_bed(_reload(db, models.bed.Bed, bed_id, BED_LOADERS))
 
 def update_bed(db: Session, bed_id: int, bed: BedUpdate):
-    db_bed = db.query(models.bed.Bed).filter(models.bed.Bed.id == bed_id).first()
-    if db_bed:
-        update_data = bed.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_bed, key, value)
-        db.commit()
-        db.refresh(db_bed)
-    return db_bed
+    return _index_bed(_update_returning(db, models.bed.Bed, bed_id, bed.dict(exclude_unset=True), ("patient",)))
 
 def delete_bed(db: Session, bed_id: int):
-    db_bed = db.query(models.bed.Bed).filter(models.bed.Bed.id == bed_id).first()
-    if db_bed:
-        db.delete(db_bed)
-        db.commit()
+    db_bed = _delete_returning(db, models.bed.Bed, bed_id, ("patient",))
+    if db_bed is not None:
+        bed_index.remove_bed(bed_id)
     return db_bed
 
+def _lock_free_bed(db: Session, room_number: Optional[str], candidates: Optional[List[int]] = None):
+    """Locks one unoccupied bed, skipping beds another transaction is allocating."""
+    bed = models.bed.Bed
+    query = select(bed).where(bed.is_occupied == False)
+    if room_number is not None:
+        query = query.where(bed.room_number == room_number)
+    if candidates is not None:
+        query = query.where(bed.id.in_(candidates))
+    query = query.order_by(bed.id).limit(1).with_for_update(skip_locked=True)
+    return db.execute(query).scalars().first()
+
+def allocate_bed(db: Session, patient_id: int, room_number: Optional[str] = None):
+    """
+    Assigns a free bed, in the given room or any room, to a patient.
+    The free-bed index proposes candidates; the locking SELECT decides. When
+    every candidate turns out to be taken, the index is resynced and the
+    table itself is searched. Returns None when the patient doesn't exist.
+    """
+    if db.get(models.patient.Patient, patient_id) is None:
+        return None
+    bed = models.bed.Bed
+    if db.execute(select(bed.id).where(bed.patient_id == patient_id)).first() is not None:
+        raise PatientAlreadyAdmittedError(patient_id)
+
+    candidates = bed_index.free_candidates(room_number)
+    db_bed = _lock_free_bed(db, room_number, candidates) if candidates else None
+    if db_bed is None:
+        load_bed_index(db, room_number)
+        db_bed = _lock_free_bed(db, room_number)
+    if db_bed is None:
+        db.rollback()
+        raise NoBedAvailableError(room_number)
+
+    db_bed.is_occupied = True
+    db_bed.patient_id = patient_id
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent allocation admitted the same patient first (beds.patient_id is unique)
+        db.rollback()
+        raise PatientAlreadyAdmittedError(patient_id)
+    _touch(db, {"beds": [db_bed.id]})
+    db.commit()
+    bed_index.set_bed(db_bed.id, db_bed.room_number, False)
+    return _reload(db, bed, db_bed.id, BED_LOADERS)
+
+def discharge_bed(db: Session, bed_id: int):
+    """Frees a bed and detaches its patient, returning the bed or None when it doesn't exist."""
+    values = {"is_occupied": False, "patient_id": None}
+    return _index_bed(_update_returning(db, models.bed.Bed, bed_id, values, ("patient",)))
+
 # --- Refactored Staff and New Role CRUD functions ---
 
 # Role CRUD
@@ -104,37 +513,42 @@ def get_role(db: Session, role_id: int):
 def get_role_by_name(db: Session, name: str):
     return db.query(models.role.Role).filter(models.role.Role.name == name).first()
 
-def get_roles(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.role.Role).offset(skip).limit(limit).all()
+def get_roles(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(models.role.Role), (models.role.Role.id,), skip=skip, limit=limit, cursor=cursor).all()
+
+def get_roles_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.role.Role, ids)
+
+def get_role_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.role.Role, (), since, limit)
 
 def create_role(db: Session, role: RoleCreate):
     db_role = models.role.Role(name=role.name, description=role.description)
     db.add(db_role)
+    db.flush()
+    _touch(db, {"roles": [db_role.id]})
     db.commit()
     db.refresh(db_role)
+    refresh_role_mask(db, db_role.id)
     return db_role
 
-def get_role(db: Session, role_id: int):
-    return db.query(models.role.Role).filter(models.role.Role.id == role_id).first()
-
-def get_roles(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.role.Role).offset(skip).limit(limit).all()
 
 def update_role(db: Session, role_id: int, role: RoleUpdate):
-    db_role = get_role(db, role_id)
+    db_role = _update_returning(db, models.role.Role, role_id, role.dict(exclude_unset=True))
     if db_role:
-        update_data = role.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_role, key, value)
-        db.commit()
-        db.refresh(db_role)
+        refresh_role_mask(db, role_id)
+        principal_cache.clear()
     return db_role
 
 def delete_role(db: Session, role_id: int):
-    db_role = get_role(db, role_id)
+    # Detach staff and permission links first, as the ORM delete used to
+    staff = models.staff.Staff
+    staff_ids = db.scalars(update(staff).where(staff.role_id == role_id).values(role_id=None).returning(staff.id)).all()
+    db.execute(update(models.role_permission.RolePermission).where(models.role_permission.RolePermission.role_id == role_id).values(role_id=None))
+    db_role = _delete_returning(db, models.role.Role, role_id, changed={"staff": staff_ids})
     if db_role:
-        db.delete(db_role)
-        db.commit()
+        forget_role(role_id)
+        principal_cache.clear()
     return db_role
 
 # Staff CRUD (Updated)
@@ -142,68 +556,244 @@ def get_staff_by_email(db: Session, email: str):
     return db.query(models.staff.Staff).options(
         joinedload(models.staff.Staff.role).joinedload(models.role.Role.permissions).joinedload(models.role_permission.RolePermission.permission)
     ).filter(models.staff.Staff.email == email).first()
-def get_staff(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.staff.Staff).offset(skip).limit(limit).all()
+def get_staff_role_id(db: Session, staff_id: int, email: str):
+    """The (role_id,) row of a staff member, or None once they are deleted; a primary key lookup for token checks."""
+    staff = models.staff.Staff
+    return db.execute(select(staff.role_id).where(staff.id == staff_id, staff.email == email)).first()
+
+def get_staff(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(models.staff.Staff).options(*STAFF_LOADERS), (models.staff.Staff.id,), skip=skip, limit=limit, cursor=cursor).all()
+
+def get_staff_member(db: Session, staff_id: int):
+    return _get_one(db, models.staff.Staff, staff_id, STAFF_LOADERS)
 
-def create_staff(db: Session, staff: StaffCreate):
-    hashed_password = get_password_hash(staff.password)
+def get_staff_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.staff.Staff, ids, STAFF_LOADERS)
+
+def get_staff_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.staff.Staff, STAFF_LOADERS, since, limit)
+
+def create_staff(db: Session, staff: StaffCreate, hashed_password: Optional[str] = None):
+    # Async callers hash on the hashing pool beforehand and pass the result in
+    if hashed_password is None:
+        hashed_password = get_password_hash(staff.password)
     # Create a dictionary of staff data, excluding the password
     db_staff_data = staff.dict(exclude={"password"})
     db_staff = models.staff.Staff(**db_staff_data, hashed_password=hashed_password)
     db.add(db_staff)
+    db.flush()
+    staff_id = db_staff.id
+    _touch(db, {"staff": [staff_id]})
     db.commit()
-    db.refresh(db_staff)
-    return db_staff
+    return _reload(db, models.staff.Staff, staff_id, STAFF_LOADERS)
 
-def update_staff(db: Session, staff_id: int, staff: StaffCreate):
+def update_staff(db: Session, staff_id: int, staff: StaffCreate, hashed_password: Optional[str] = None):
     db_staff = db.query(models.staff.Staff).filter(models.staff.Staff.id == staff_id).first()
     if db_staff:
         update_data = staff.dict(exclude_unset=True)
         if 'password' in update_data:
-            hashed_password = get_password_hash(update_data['password'])
+            if hashed_password is None:
+                hashed_password = get_password_hash(update_data['password'])
             db_staff.hashed_password = hashed_password
             del update_data['password']
         
         for key, value in update_data.items():
             setattr(db_staff, key, value)
         
+        db.flush()
+        _touch(db, {"staff": [staff_id]})
         db.commit()
-        db.refresh(db_staff)
+        db_staff = _reload(db, models.staff.Staff, staff_id, STAFF_LOADERS)
+        principal_cache.clear()
     return db_staff
 
+def update_staff_password_hash(db: Session, staff_id: int, hashed_password: str):
+    db.query(models.staff.Staff).filter(models.staff.Staff.id == staff_id).update(
+        {models.staff.Staff.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
 def delete_staff(db: Session, staff_id: int):
-    # Eagerly load the role relationship before the session is closed by the commit
-    db_staff = db.query(models.staff.Staff).options(
-        joinedload(models.staff.Staff.role)
-    ).filter(models.staff.Staff.id == staff_id).first()
-    
+    # Detach dispensations here rather than through ON DELETE SET NULL, so delta sync sees them change
+    dispensation = models.dispensation.Dispensation
+    dispensation_ids = db.scalars(update(dispensation).where(dispensation.staff_id == staff_id).values(staff_id=None).returning(dispensation.id)).all()
+    db_staff = _delete_returning(db, models.staff.Staff, staff_id, ("role",), changed={"dispensations": dispensation_ids})
     if db_staff:
-        db.delete(db_staff)
-        db.commit()
+        principal_cache.clear()
     return db_staff
 
 # Invoice CRUD
-def get_invoices(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.invoice.Invoice).offset(skip).limit(limit).all()
+def get_invoices(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[InvoiceFilter] = None):
+    return _list(db, models.invoice.Invoice, INVOICE_LOADERS, filters, skip, limit, cursor)
+
+def get_invoice(db: Session, invoice_id: int):
+    return _get_one(db, models.invoice.Invoice, invoice_id, INVOICE_LOADERS)
+
+def get_invoices_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.invoice.Invoice, ids, INVOICE_LOADERS)
+
+def get_invoice_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.invoice.Invoice, INVOICE_LOADERS, since, limit)
+
+def _roll_invoice(deltas: dict, date_issued: datetime.datetime, patient_id: int, amount: float, status: str, sign: int, billed: bool = False):
+    """Accumulates adding (sign=1) or removing (sign=-1) an invoice under `status` into `deltas`."""
+    rollup = deltas.setdefault("rollups", {}).setdefault((date_issued.date(), status), {"invoice_count": 0, "amount_total": 0.0})
+    rollup["invoice_count"] += sign
+    rollup["amount_total"] += sign * amount
+    outstanding = status in UNPAID_INVOICE_STATUSES
+    if outstanding or billed:
+        balance = deltas.setdefault("balances", {}).setdefault(patient_id, {"billed_total": 0.0, "outstanding_amount": 0.0, "outstanding_count": 0})
+        balance["billed_total"] += amount if billed else 0.0
+        balance["outstanding_amount"] += sign * amount if outstanding else 0.0
+        balance["outstanding_count"] += sign if outstanding else 0
+
+def _apply_invoice_deltas(db: Session, deltas: dict):
+    """
+    Writes accumulated rollup deltas. Every invoice write locks the rollup rows
+    sorted by (day, status) and then the balance rows sorted by patient, so two
+    transactions touching the same rows always queue instead of deadlocking.
+    """
+    for (day, status), increments in sorted(deltas.get("rollups", {}).items()):
+        _upsert_add(db, InvoiceDailyRollup, {"day": day, "status": status}, increments)
+    for patient_id, increments in sorted(deltas.get("balances", {}).items()):
+        _upsert_add(db, PatientBalance, {"patient_id": patient_id}, increments)
 
 def create_invoice(db: Session, invoice: InvoiceCreate):
     db_invoice = models.invoice.Invoice(**invoice.dict())
     db.add(db_invoice)
+    db.flush()
+    invoice_id = db_invoice.id
+    deltas = {}
+    _roll_invoice(deltas, db_invoice.date_issued, db_invoice.patient_id, db_invoice.amount, db_invoice.status, 1, billed=True)
+    _apply_invoice_deltas(db, deltas)
+    _touch(db, {"invoices": [invoice_id]})
     db.commit()
-    db.refresh(db_invoice)
-    return db_invoice
+    return _reload(db, models.invoice.Invoice, invoice_id, INVOICE_LOADERS)
 
 def update_invoice_status(db: Session, invoice_id: int, status: str):
-    db_invoice = db.query(models.invoice.Invoice).filter(models.invoice.Invoice.id == invoice_id).first()
-    if db_invoice:
-        db_invoice.status = status
-        db.commit()
-        db.refresh(db_invoice)
-    return db_invoice
+    invoice = models.invoice.Invoice
+    # Lock the invoice so the status being moved out of in the rollups is the one replaced
+    current = db.execute(
+        select(invoice.status, invoice.amount, invoice.date_issued, invoice.patient_id)
+        .where(invoice.id == invoice_id)
+        .with_for_update()
+    ).first()
+    if current is None:
+        db.rollback()
+        return None
+    if current.status != status:
+        deltas = {}
+        _roll_invoice(deltas, current.date_issued, current.patient_id, current.amount, current.status, -1)
+        _roll_invoice(deltas, current.date_issued, current.patient_id, current.amount, status, 1)
+        _apply_invoice_deltas(db, deltas)
+    return _update_returning(db, invoice, invoice_id, {"status": status}, ("patient",))
+
+# Billing analytics
+def rebuild_invoice_rollups(db: Session):
+    """Recomputes the billing rollup tables from the invoices, e.g. after a bulk import or repair."""
+    invoice = models.invoice.Invoice
+    if db.get_bind().dialect.name == "postgresql":
+        # Keep invoice writes out until the rebuilt totals are committed
+        db.execute(text("LOCK TABLE invoices IN SHARE MODE"))
+    day = cast(func.date(invoice.date_issued), Date)
+    outstanding = invoice.status.in_(UNPAID_INVOICE_STATUSES)
+    db.execute(delete(InvoiceDailyRollup))
+    db.execute(delete(PatientBalance))
+    db.execute(insert(InvoiceDailyRollup).from_select(
+        ["day", "status", "invoice_count", "amount_total"],
+        select(day, invoice.status, func.count(), func.sum(invoice.amount)).group_by(day, invoice.status),
+    ))
+    db.execute(insert(PatientBalance).from_select(
+        ["patient_id", "billed_total", "outstanding_amount", "outstanding_count"],
+        select(
+            invoice.patient_id,
+            func.sum(invoice.amount),
+            func.sum(case((outstanding, invoice.amount), else_=0.0)),
+            func.sum(case((outstanding, 1), else_=0)),
+        ).group_by(invoice.patient_id),
+    ))
+    db.commit()
+
+def _month_of(db: Session, day):
+    # Constants are inlined so the expression is identical in SELECT and GROUP BY
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc(literal_column("'month'"), day), Date)
+    return func.strftime(literal_column("'%Y-%m-01'"), day)
+
+def get_revenue(db: Session, granularity: str = "day", start: Optional[datetime.date] = None,
+                end: Optional[datetime.date] = None, status: Optional[str] = None):
+    """
+    Invoice count and amount per period and status, read from the daily rollups,
+    with a running total per status across the requested window.
+    """
+    rollup = InvoiceDailyRollup
+    period = rollup.day if granularity == "day" else _month_of(db, rollup.day)
+    amount_total = func.sum(rollup.amount_total)
+    query = select(
+        period.label("period"),
+        rollup.status,
+        func.sum(rollup.invoice_count).label("invoice_count"),
+        amount_total.label("amount_total"),
+        func.sum(amount_total).over(partition_by=rollup.status, order_by=period).label("running_total"),
+    )
+    # Rows whose invoices all moved to another status stay behind with a zero count
+    query = query.where(rollup.invoice_count > 0)
+    if start is not None:
+        query = query.where(rollup.day >= start)
+    if end is not None:
+        query = query.where(rollup.day < end)
+    if status is not None:
+        query = query.where(rollup.status == status)
+    query = query.group_by(period, rollup.status).order_by(period, rollup.status)
+    return [row._asdict() for row in db.execute(query)]
+
+AGING_BUCKETS = ((30, "0-30"), (60, "31-60"), (90, "61-90"))
+
+def get_invoice_aging(db: Session, now: datetime.datetime):
+    """Count and amount of unpaid invoices per age bucket (days since issue)."""
+    invoice = models.invoice.Invoice
+    bucket = case(
+        *((invoice.date_issued >= now - datetime.timedelta(days=days), literal_column(f"'{label}'")) for days, label in AGING_BUCKETS),
+        else_=literal_column("'90+'"),
+    )
+    aged = (
+        select(bucket.label("bucket"), invoice.amount)
+        .where(invoice.status.in_(UNPAID_INVOICE_STATUSES))
+        .subquery()
+    )
+    totals = {
+        label: (count, amount)
+        for label, count, amount in db.execute(select(aged.c.bucket, func.count(), func.sum(aged.c.amount)).group_by(aged.c.bucket))
+    }
+    buckets = []
+    for label in [label for _, label in AGING_BUCKETS] + ["90+"]:
+        count, amount = totals.get(label, (0, 0.0))
+        buckets.append({"bucket": label, "invoice_count": count, "amount_total": float(amount or 0)})
+    return buckets
+
+def get_patient_balances(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, min_outstanding: float = 0.0):
+    """Patients with an outstanding balance above `min_outstanding`, largest balance first."""
+    balance = PatientBalance
+    # A settled balance can keep a float residue above zero; the count is exact
+    query = db.query(balance).filter(balance.outstanding_count > 0, balance.outstanding_amount > min_outstanding)
+    return paginate(query, (balance.outstanding_amount, balance.patient_id), skip=skip, limit=limit, cursor=cursor, descending=True).all()
+
+def get_patient_balance(db: Session, patient_id: int):
+    """A patient's balance, zero when they have no invoices; None when the patient doesn't exist."""
+    db_balance = db.get(PatientBalance, patient_id)
+    if db_balance is None and db.get(models.patient.Patient, patient_id) is not None:
+        return PatientBalance(patient_id=patient_id, billed_total=0.0, outstanding_amount=0.0, outstanding_count=0)
+    return db_balance
 
 # Medicine CRUD
-def get_medicines(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.medicine.Medicine).offset(skip).limit(limit).all()
+def get_medicines(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[MedicineFilter] = None):
+    return _list(db, models.medicine.Medicine, (), filters, skip, limit, cursor)
+
+def get_medicines_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.medicine.Medicine, ids)
+
+def get_medicine_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.medicine.Medicine, (), since, limit)
 
 def get_medicine(db: Session, medicine_id: int):
     return db.query(models.medicine.Medicine).filter(models.medicine.Medicine.id == medicine_id).first()
@@ -211,53 +801,313 @@ def get_medicine(db: Session, medicine_id: int):
 def create_medicine(db: Session, medicine: MedicineCreate):
     db_medicine = models.medicine.Medicine(**medicine.dict())
     db.add(db_medicine)
+    db.flush()
+    if db_medicine.stock_quantity:
+        _record_movement(db, db_medicine.id, ADJUSTMENT, db_medicine.stock_quantity, note="Opening stock")
+    _touch(db, {"medicines": [db_medicine.id]})
     db.commit()
-    db.refresh(db_medicine)
     return db_medicine
 
 def update_medicine(db: Session, medicine_id: int, medicine: MedicineUpdate):
-    db_medicine = get_medicine(db, medicine_id)
-    if db_medicine:
-        update_data = medicine.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_medicine, key, value)
-        db.commit()
-        db.refresh(db_medicine)
-    return db_medicine
+    return _update_returning(db, models.medicine.Medicine, medicine_id, medicine.dict(exclude_unset=True))
 
 def restock_medicine(db: Session, medicine_id: int, restock: MedicineRestock):
-    db_medicine = get_medicine(db, medicine_id)
-    if db_medicine:
-        db_medicine.stock_quantity += restock.quantity_added
-        db.commit()
-        db.refresh(db_medicine)
+    # A single atomic increment: no read-modify-write and no explicit row lock
+    medicine = models.medicine.Medicine
+    stmt = (
+        update(medicine)
+        .where(medicine.id == medicine_id)
+        .values(stock_quantity=medicine.stock_quantity + restock.quantity_added)
+        .returning(medicine)
+    )
+    db_medicine = db.execute(stmt).scalars().first()
+    if db_medicine is None:
+        db.rollback()
+        return None
+    _record_movement(db, medicine_id, RESTOCK, restock.quantity_added)
+    _touch(db, {"medicines": [medicine_id]})
+    db.commit()
     return db_medicine
 
-def delete_medicine(db: Session, medicine_id: int):
-    db_medicine = get_medicine(db, medicine_id)
-    if db_medicine:
-        db.delete(db_medicine)
-        db.commit()
+def adjust_medicine_stock(db: Session, medicine_id: int, adjustment: MedicineAdjust):
+    """Applies a manual stock correction, refusing to take stock below zero."""
+    medicine = models.medicine.Medicine
+    stmt = (
+        update(medicine)
+        .where(medicine.id == medicine_id, medicine.stock_quantity + adjustment.quantity_change >= 0)
+        .values(stock_quantity=medicine.stock_quantity + adjustment.quantity_change)
+        .returning(medicine)
+    )
+    db_medicine = db.execute(stmt).scalars().first()
+    if db_medicine is None:
+        available = db.execute(select(medicine.stock_quantity).where(medicine.id == medicine_id)).scalar_one_or_none()
+        db.rollback()
+        if available is None:
+            return None
+        raise InsufficientStockError(medicine_id, -adjustment.quantity_change, available)
+    _record_movement(db, medicine_id, ADJUSTMENT, adjustment.quantity_change, note=adjustment.note)
+    _touch(db, {"medicines": [medicine_id]})
+    db.commit()
     return db_medicine
 
+def delete_medicine(db: Session, medicine_id: int):
+    return _delete_returning(db, models.medicine.Medicine, medicine_id)
+
+# Stock Ledger
+def _record_movement(db: Session, medicine_id: int, kind: str, quantity: int, dispensation_id: Optional[int] = None, note: Optional[str] = None):
+    # Always appended after the stock UPDATE, so ledger ids follow the row lock order per medicine
+    db.add(models.stock_movement.StockMovement(
+        medicine_id=medicine_id, kind=kind, quantity=quantity, dispensation_id=dispensation_id, note=note
+    ))
+
+def get_stock_movements(db: Session, medicine_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    movement = models.stock_movement.StockMovement
+    query = db.query(movement).filter(movement.medicine_id == medicine_id)
+    return paginate(query, (movement.id,), skip=skip, limit=limit, cursor=cursor).all()
+
+def create_stock_snapshots(db: Session, only_missing: bool = False) -> int:
+    """
+    Records the current stock of every medicine together with the last ledger
+    entry it covers, in a single INSERT ... SELECT so both are read consistently.
+    With `only_missing`, only medicines without any snapshot are recorded: this
+    gives medicines stocked before the ledger existed an opening balance.
+    """
+    medicine = models.medicine.Medicine
+    movement = models.stock_movement.StockMovement
+    snapshot = models.stock_snapshot.StockSnapshot
+    last_movement_id = (
+        select(func.coalesce(func.max(movement.id), 0))
+        .where(movement.medicine_id == medicine.id)
+        .scalar_subquery()
+    )
+    taken_at = literal(datetime.datetime.utcnow(), snapshot.taken_at.type)
+    current = select(medicine.id, func.coalesce(medicine.stock_quantity, 0), last_movement_id, taken_at)
+    if only_missing:
+        current = current.where(~select(snapshot.id).where(snapshot.medicine_id == medicine.id).exists())
+    result = db.execute(
+        insert(snapshot).from_select(["medicine_id", "stock_quantity", "last_movement_id", "taken_at"], current)
+    )
+    db.commit()
+    return result.rowcount
+
+def get_stock_level_at(db: Session, medicine_id: int, at: datetime.datetime) -> Optional[int]:
+    """
+    Answers "how much stock did this medicine have at time `at`" from the latest
+    snapshot taken before then plus the ledger entries recorded after it.
+    Returns None when the medicine does not exist.
+    """
+    movement = models.stock_movement.StockMovement
+    snapshot = models.stock_snapshot.StockSnapshot
+    if db.get(models.medicine.Medicine, medicine_id) is None:
+        return None
+    base = db.execute(
+        select(snapshot.stock_quantity, snapshot.last_movement_id)
+        .where(snapshot.medicine_id == medicine_id, snapshot.taken_at <= at)
+        .order_by(snapshot.taken_at.desc())
+        .limit(1)
+    ).first()
+    base_quantity, last_movement_id = base if base else (0, 0)
+    delta = db.execute(
+        select(func.coalesce(func.sum(movement.quantity), 0))
+        .where(movement.medicine_id == medicine_id, movement.id > last_movement_id, movement.created_at <= at)
+    ).scalar_one()
+    return base_quantity + delta
+
 # Dispensation CRUD
-def get_dispensations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.dispensation.Dispensation).offset(skip).limit(limit).all()
+def get_dispensations(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[DispensationFilter] = None):
+    return _list(db, models.dispensation.Dispensation, DISPENSATION_LOADERS, filters, skip, limit, cursor)
+
+def get_dispensation(db: Session, dispensation_id: int):
+    return _get_one(db, models.dispensation.Dispensation, dispensation_id, DISPENSATION_LOADERS)
+
+def get_dispensations_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.dispensation.Dispensation, ids, DISPENSATION_LOADERS)
+
+def get_dispensation_changes(db: Session, since: Optional[str] = None, limit: int = 100):
+    return get_changes(db, models.dispensation.Dispensation, DISPENSATION_LOADERS, since, limit)
+
+def _decrement_stock(db: Session, medicine_id: int, quantity: int) -> int:
+    """
+    Atomically takes `quantity` units out of stock with a conditional UPDATE,
+    so concurrent dispensations can never oversell. Returns the remaining stock.
+    """
+    medicine = models.medicine.Medicine
+    stmt = (
+        update(medicine)
+        .where(medicine.id == medicine_id, medicine.stock_quantity >= quantity)
+        .values(stock_quantity=medicine.stock_quantity - quantity)
+        .returning(medicine.stock_quantity)
+    )
+    remaining = db.execute(stmt, execution_options={"synchronize_session": False}).scalar_one_or_none()
+    if remaining is None:
+        available = db.execute(select(medicine.stock_quantity).where(medicine.id == medicine_id)).scalar_one_or_none()
+        db.rollback()
+        if available is None:
+            raise MedicineNotFoundError(medicine_id)
+        raise InsufficientStockError(medicine_id, quantity, available)
+    return remaining
 
 def create_dispensation(db: Session, dispensation: DispensationCreate, staff_id: int):
-    db_medicine = get_medicine(db, dispensation.medicine_id)
-    if not db_medicine:
-        return None # Or raise exception
-    if db_medicine.stock_quantity < dispensation.quantity_dispensed:
-        return None # Or raise exception
-
-    # Atomically update stock and create dispensation record
-    db_medicine.stock_quantity -= dispensation.quantity_dispensed
+    """
+    Dispenses medicine, raising MedicineNotFoundError or InsufficientStockError
+    instead of touching anything when the request cannot be satisfied.
+    """
+    _decrement_stock(db, dispensation.medicine_id, dispensation.quantity_dispensed)
     db_dispensation = models.dispensation.Dispensation(**dispensation.dict(), staff_id=staff_id)
-    
+
     db.add(db_dispensation)
+    db.flush()
+    dispensation_id = db_dispensation.id
+    _record_movement(db, dispensation.medicine_id, DISPENSE, -dispensation.quantity_dispensed, dispensation_id=dispensation_id)
+    _touch(db, {"dispensations": [dispensation_id], "medicines": [dispensation.medicine_id]})
+    db.commit()
+
+    return _reload(db, models.dispensation.Dispensation, dispensation_id, DISPENSATION_LOADERS)
+
+def create_dispensations_batch(db: Session, dispensations: List[DispensationCreate], staff_id: int):
+    """
+    Dispenses every item of a prescription in one transaction, all or nothing.
+    Stock rows are locked in medicine_id order so that concurrent batches cannot
+    deadlock, then decremented with one set-based UPDATE, and the dispensations
+    and their ledger entries are inserted with multi-row INSERTs. The statement
+    count does not grow with the number of items.
+    """
+    if not dispensations:
+        return []
+    medicine = models.medicine.Medicine
+    dispensation_model = models.dispensation.Dispensation
+
+    requested = defaultdict(int)
+    for item in dispensations:
+        requested[item.medicine_id] += item.quantity_dispensed
+    medicine_ids = sorted(requested)
+
+    locked = db.execute(
+        select(medicine.id, medicine.stock_quantity)
+        .where(medicine.id.in_(medicine_ids))
+        .order_by(medicine.id)
+        .with_for_update()
+    ).all()
+    available = {medicine_id: stock for medicine_id, stock in locked}
+
+    errors = []
+    for index, item in enumerate(dispensations):
+        if item.medicine_id not in available:
+            errors.append({"index": index, "medicine_id": item.medicine_id, "error": "Medicine not found."})
+        elif available[item.medicine_id] < requested[item.medicine_id]:
+            errors.append({
+                "index": index,
+                "medicine_id": item.medicine_id,
+                "error": f"Insufficient stock: requested {requested[item.medicine_id]} in total, available {available[item.medicine_id]}.",
+            })
+    if errors:
+        db.rollback()
+        raise DispensationBatchError(errors)
+
+    db.execute(
+        update(medicine)
+        .where(medicine.id.in_(medicine_ids))
+        .values(stock_quantity=medicine.stock_quantity - case(dict(requested), value=medicine.id, else_=0)),
+        execution_options={"synchronize_session": False},
+    )
+    dispensation_ids = db.scalars(
+        insert(dispensation_model).returning(dispensation_model.id, sort_by_parameter_order=True),
+        [{**item.dict(), "staff_id": staff_id} for item in dispensations],
+    ).all()
+    db.execute(
+        insert(models.stock_movement.StockMovement),
+        [
+            {"medicine_id": item.medicine_id, "kind": DISPENSE, "quantity": -item.quantity_dispensed, "dispensation_id": dispensation_id}
+            for item, dispensation_id in zip(dispensations, dispensation_ids)
+        ],
+    )
+    _touch(db, {"dispensations": dispensation_ids, "medicines": medicine_ids})
     db.commit()
-    db.refresh(db_dispensation)
-    
-    return db_dispensation
 
+    loaded = db.query(dispensation_model).options(*DISPENSATION_LOADERS).filter(dispensation_model.id.in_(dispensation_ids)).all()
+    by_id = {row.id: row for row in loaded}
+    return [by_id[dispensation_id] for dispensation_id in dispensation_ids]
+
+# Dashboard statistics
+def get_dashboard_stats(db: Session, day_start: datetime.datetime, day_end: datetime.datetime, low_stock_threshold: int):
+    """
+    Computes the dashboard numbers in one round trip: a UNION ALL of aggregates,
+    each returning (metric, label, count, total) rows.
+    """
+    bed = models.bed.Bed
+    appointment = models.appointment.Appointment
+    invoice = models.invoice.Invoice
+    medicine = models.medicine.Medicine
+    no_total = cast(null(), Float).label("total")
+    occupancy = case((bed.is_occupied == True, literal_column("'occupied'")), else_=literal_column("'free'"))
+    statement = union_all(
+        select(literal_column("'beds'").label("metric"), occupancy.label("label"), func.count().label("count"), no_total)
+        .group_by(occupancy),
+        select(literal_column("'appointments'"), appointment.status, func.count(), no_total)
+        .where(appointment.appointment_date >= day_start, appointment.appointment_date < day_end)
+        .group_by(appointment.status),
+        select(literal_column("'unpaid'"), literal_column("''"), func.count(), func.coalesce(func.sum(invoice.amount), 0.0))
+        .where(invoice.status.in_(UNPAID_INVOICE_STATUSES)),
+        select(literal_column("'low_stock'"), literal_column("''"), func.count(), no_total)
+        .select_from(medicine)
+        .where(medicine.stock_quantity <= low_stock_threshold),
+    )
+
+    stats = {
+        "beds_occupied": 0,
+        "beds_free": 0,
+        "appointments_today": {},
+        "unpaid_invoice_count": 0,
+        "unpaid_invoice_total": 0.0,
+        "low_stock_medicines": 0,
+    }
+    for metric, label, count, total in db.execute(statement):
+        if metric == "beds":
+            stats[f"beds_{label}"] += count
+        elif metric == "appointments":
+            stats["appointments_today"][label or "Unknown"] = count
+        elif metric == "unpaid":
+            stats["unpaid_invoice_count"] = count
+            stats["unpaid_invoice_total"] = float(total or 0)
+        else:
+            stats["low_stock_medicines"] = count
+    return stats
+
+# Exports
+# Flat column selections, so streamed rows never enter the session's identity map.
+def _export_query(model, columns, filters: ListFilter, *joins):
+    query = select(*columns).select_from(model)
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+    keys = [getattr(model, name) for name in filters.cursor_keys()]
+    order = [key.desc() if filters.order == "desc" else key.asc() for key in keys]
+    return query.where(*_filter_conditions(model, filters)).order_by(*order)
+
+def invoice_export_query(filters: InvoiceFilter):
+    invoice = models.invoice.Invoice
+    patient = models.patient.Patient
+    columns = (
+        invoice.id, invoice.date_issued, invoice.patient_id,
+        patient.first_name.label("patient_first_name"), patient.last_name.label("patient_last_name"),
+        invoice.amount, invoice.status, invoice.description,
+    )
+    return _export_query(invoice, columns, filters, (patient, patient.id == invoice.patient_id))
+
+def dispensation_export_query(filters: DispensationFilter):
+    dispensation = models.dispensation.Dispensation
+    medicine = models.medicine.Medicine
+    columns = (
+        dispensation.id, dispensation.date_dispensed, dispensation.patient_id, dispensation.medicine_id,
+        medicine.name.label("medicine_name"), dispensation.quantity_dispensed, dispensation.staff_id, dispensation.notes,
+    )
+    return _export_query(dispensation, columns, filters, (medicine, medicine.id == dispensation.medicine_id))
+
+def appointment_export_query(filters: AppointmentFilter):
+    appointment = models.appointment.Appointment
+    patient = models.patient.Patient
+    columns = (
+        appointment.id, appointment.appointment_date, appointment.duration_minutes, appointment.doctor_name,
+        appointment.patient_id, patient.first_name.label("patient_first_name"), patient.last_name.label("patient_last_name"),
+        appointment.status, appointment.reason,
+    )
+    return _export_query(appointment, columns, filters, (patient, patient.id == appointment.patient_id))
@@ -0,0 +1,147 @@
+from functools import wraps
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .reference_cache import medicine_cache, role_cache
+from .serialization import FAST_JSON_RESPONSES, serializer_for
+from .schemas.appointment import Appointment, FreeSlot
+from .schemas.bed import Bed
+from .schemas.billing import AgingBucket, PatientBalance, RevenuePeriod
+from .schemas.dispensation import Dispensation
+from .schemas.invoice import Invoice
+from .schemas.medicine import Medicine, StockMovement
+from .schemas.patient import Patient
+from .schemas.role import Role
+from .schemas.staff import Staff
+from .schemas.sync import ChangeSet
+
+# Async counterparts of the crud functions. Each one runs the sync implementation on
+# the AsyncSession's connection via run_sync, so the query logic lives in crud.py only.
+# When a response schema is given, results are converted inside the same greenlet,
+# because relationships cannot be lazy-loaded once control is back on the event loop.
+
+def _bridge(fn: Callable, schema: Optional[type] = None, trusted: bool = False):
+    # Trusted results feed serialization.trusted_json: plain dicts, without validation
+    validate = serializer_for(schema) if trusted and FAST_JSON_RESPONSES else getattr(schema, "model_validate", None)
+
+    def convert(result):
+        if schema is None or result is None:
+            return result
+        if isinstance(result, list):
+            return [validate(item) for item in result]
+        return validate(result)
+
+    @wraps(fn)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(lambda session: convert(fn(session, *args, **kwargs)))
+    return wrapper
+
+def _invalidating(fn: Callable, *caches):
+    # Write-through: the read caches are invalidated once the write has committed
+    @wraps(fn)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        result = await fn(db, *args, **kwargs)
+        for cache in caches:
+            await cache.invalidate()
+        return result
+    return wrapper
+
+# Table versions
+get_table_versions = _bridge(crud.get_table_versions)
+
+# Patient CRUD functions
+get_patients = _bridge(crud.get_patients, Patient, trusted=True)
+get_patient = _bridge(crud.get_patient, Patient)
+get_patients_by_ids = _bridge(crud.get_patients_by_ids, Patient, trusted=True)
+get_patient_changes = _bridge(crud.get_patient_changes, ChangeSet[Patient])
+create_patient = _bridge(crud.create_patient, Patient)
+update_patient = _bridge(crud.update_patient, Patient)
+delete_patient = _bridge(crud.delete_patient, Patient)
+search_patients = _bridge(crud.search_patients, Patient, trusted=True)
+
+# Appointment CRUD functions
+get_appointments = _bridge(crud.get_appointments, Appointment, trusted=True)
+get_appointment = _bridge(crud.get_appointment, Appointment)
+get_appointments_by_ids = _bridge(crud.get_appointments_by_ids, Appointment, trusted=True)
+get_appointment_changes = _bridge(crud.get_appointment_changes, ChangeSet[Appointment])
+create_appointment = _bridge(crud.create_appointment, Appointment)
+update_appointment = _bridge(crud.update_appointment, Appointment)
+delete_appointment = _bridge(crud.delete_appointment, Appointment)
+get_doctor_availability = _bridge(crud.get_doctor_availability, FreeSlot)
+
+# Bed CRUD functions
+get_beds = _bridge(crud.get_beds, Bed, trusted=True)
+get_bed = _bridge(crud.get_bed, Bed)
+get_beds_by_ids = _bridge(crud.get_beds_by_ids, Bed, trusted=True)
+get_bed_changes = _bridge(crud.get_bed_changes, ChangeSet[Bed])
+create_bed = _bridge(crud.create_bed, Bed)
+update_bed = _bridge(crud.update_bed, Bed)
+delete_bed = _bridge(crud.delete_bed, Bed)
+allocate_bed = _bridge(crud.allocate_bed, Bed)
+discharge_bed = _bridge(crud.discharge_bed, Bed)
+
+# Role CRUD
+get_role = role_cache.cached(_bridge(crud.get_role, Role))
+get_role_by_name = _bridge(crud.get_role_by_name, Role)
+get_roles = role_cache.cached(_bridge(crud.get_roles, Role, trusted=True))
+get_roles_by_ids = role_cache.cached(_bridge(crud.get_roles_by_ids, Role, trusted=True))
+get_role_changes = _bridge(crud.get_role_changes, ChangeSet[Role])
+create_role = _invalidating(_bridge(crud.create_role, Role), role_cache)
+update_role = _invalidating(_bridge(crud.update_role, Role), role_cache)
+delete_role = _invalidating(_bridge(crud.delete_role, Role), role_cache)
+
+# Staff CRUD (get_staff_by_email eagerly loads everything authentication needs)
+get_staff_by_email = _bridge(crud.get_staff_by_email)
+get_staff_role_id = _bridge(crud.get_staff_role_id)
+get_staff = _bridge(crud.get_staff, Staff, trusted=True)
+get_staff_member = _bridge(crud.get_staff_member, Staff)
+get_staff_by_ids = _bridge(crud.get_staff_by_ids, Staff, trusted=True)
+get_staff_changes = _bridge(crud.get_staff_changes, ChangeSet[Staff])
+create_staff = _bridge(crud.create_staff, Staff)
+update_staff = _bridge(crud.update_staff, Staff)
+update_staff_password_hash = _bridge(crud.update_staff_password_hash)
+delete_staff = _bridge(crud.delete_staff, Staff)
+
+# Invoice CRUD
+get_invoices = _bridge(crud.get_invoices, Invoice, trusted=True)
+get_invoice = _bridge(crud.get_invoice, Invoice)
+get_invoices_by_ids = _bridge(crud.get_invoices_by_ids, Invoice, trusted=True)
+get_invoice_changes = _bridge(crud.get_invoice_changes, ChangeSet[Invoice])
+create_invoice = _bridge(crud.create_invoice, Invoice)
+update_invoice_status = _bridge(crud.update_invoice_status, Invoice)
+
+# Billing analytics
+rebuild_invoice_rollups = _bridge(crud.rebuild_invoice_rollups)
+get_revenue = _bridge(crud.get_revenue, RevenuePeriod)
+get_invoice_aging = _bridge(crud.get_invoice_aging, AgingBucket)
+get_patient_balances = _bridge(crud.get_patient_balances, PatientBalance, trusted=True)
+get_patient_balance = _bridge(crud.get_patient_balance, PatientBalance)
+
+# Medicine CRUD
+get_medicines = medicine_cache.cached(_bridge(crud.get_medicines, Medicine, trusted=True))
+get_medicines_by_ids = medicine_cache.cached(_bridge(crud.get_medicines_by_ids, Medicine, trusted=True))
+get_medicine_changes = _bridge(crud.get_medicine_changes, ChangeSet[Medicine])
+get_medicine = medicine_cache.cached(_bridge(crud.get_medicine, Medicine))
+create_medicine = _invalidating(_bridge(crud.create_medicine, Medicine), medicine_cache)
+update_medicine = _invalidating(_bridge(crud.update_medicine, Medicine), medicine_cache)
+restock_medicine = _invalidating(_bridge(crud.restock_medicine, Medicine), medicine_cache)
+adjust_medicine_stock = _invalidating(_bridge(crud.adjust_medicine_stock, Medicine), medicine_cache)
+delete_medicine = _invalidating(_bridge(crud.delete_medicine, Medicine), medicine_cache)
+
+# Stock Ledger
+get_stock_movements = _bridge(crud.get_stock_movements, StockMovement, trusted=True)
+get_stock_level_at = _bridge(crud.get_stock_level_at)
+create_stock_snapshots = _bridge(crud.create_stock_snapshots)
+
+# Dispensation CRUD
+get_dispensations = _bridge(crud.get_dispensations, Dispensation, trusted=True)
+get_dispensation = _bridge(crud.get_dispensation, Dispensation)
+get_dispensations_by_ids = _bridge(crud.get_dispensations_by_ids, Dispensation, trusted=True)
+get_dispensation_changes = _bridge(crud.get_dispensation_changes, ChangeSet[Dispensation])
+create_dispensation = _invalidating(_bridge(crud.create_dispensation, Dispensation), medicine_cache)
+create_dispensations_batch = _invalidating(_bridge(crud.create_dispensations_batch, Dispensation), medicine_cache)
+
+# Dashboard statistics
+get_dashboard_stats = _bridge(crud.get_dashboard_stats)
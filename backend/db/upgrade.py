@@ -0,0 +1,80 @@
+import logging
+
+from sqlalchemy import BigInteger, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+
+from .base import Base
+
+logger = logging.getLogger(__name__)
+
+# --- Schema Upgrade --- #
+
+def _add_column(engine, table, column) -> None:
+    preparer = engine.dialect.identifier_preparer
+    if column.nullable is False and column.server_default is None:
+        raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default")
+    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {if_not_exists}{ddl}"))
+    except DBAPIError:
+        # Another worker starting at the same time may have added it first
+        if column.name not in {existing["name"] for existing in inspect(engine).get_columns(table.name)}:
+            raise
+    logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _widen_column(engine, table, column) -> None:
+    preparer = engine.dialect.identifier_preparer
+    type_ = column.type.compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {preparer.format_column(column)} TYPE {type_}"
+        ))
+    logger.info("Widened column %s.%s to %s", table.name, column.name, type_)
+
+
+def upgrade_schema(engine) -> None:
+    """
+    Brings tables created by an older release up to the models, after create_all
+    has created the missing tables: adds missing columns (with their server
+    defaults, e.g. row_version 0 for rows written before versioning), widens
+    integer version columns to BIGINT on PostgreSQL, and creates missing indexes.
+    Idempotent and safe to run from several workers at once. An index that cannot
+    be created, e.g. a trigram index without pg_trgm, is logged and skipped.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                _add_column(engine, table, column)
+            elif (
+                engine.dialect.name == "postgresql"
+                and isinstance(column.type, BigInteger)
+                and not isinstance(columns[column.name]["type"], BigInteger)
+            ):
+                _widen_column(engine, table, column)
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing = [index for index in table.indexes if index.name not in existing_indexes]
+        if not missing:
+            continue
+        try:
+            # The table's own before_create DDL, e.g. CREATE EXTENSION pg_trgm for its indexes
+            with engine.begin() as conn:
+                table.dispatch.before_create(table, conn, checkfirst=True, _ddl_runner=None, _is_metadata_operation=False)
+        except DBAPIError as exc:
+            logger.warning("Could not prepare indexes of %s: %s", table.name, exc.orig)
+        for index in missing:
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except DBAPIError as exc:
+                logger.warning("Could not create index %s: %s", index.name, exc.orig)
+            else:
+                logger.info("Created index %s", index.name)
@@ -0,0 +1,54 @@
+import hashlib
+from typing import Dict, Sequence
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud_async
+from .database import get_async_read_db
+
+# --- Conditional GET --- #
+
+class NotModified(Exception):
+    """Raised when the client's cached representation is still current; answered with 304."""
+
+    def __init__(self, etag: str):
+        super().__init__("Not modified.")
+        self.etag = etag
+
+
+def compute_etag(versions: Sequence[int], request: Request) -> str:
+    """A weak ETag from the versions of the tables a listing reads and its query parameters."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(request.url.path.encode())
+    digest.update(str(sorted(request.query_params.multi_items())).encode())
+    return f'W/"{".".join(str(version) for version in versions)}-{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header value."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_get(*tables: str):
+    """
+    Dependency for list endpoints whose response only changes when one of `tables` is written.
+    It reads the table versions (one indexed lookup) before any row is loaded and raises
+    NotModified when the client already holds the current representation; otherwise it
+    sets the ETag on the response. The versions are read first, so a response can only be
+    newer than its ETag, never older. Returns the versions by table, for routes whose
+    cached reads must be keyed to them (see ReadThroughCache.cached).
+    """
+    async def check(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)) -> Dict[str, int]:
+        versions = await crud_async.get_table_versions(db, list(tables))
+        etag = compute_etag(versions, request)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        return dict(zip(tables, versions))
+    return check
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# --- Change Events --- #
+
+# Tables whose writes are pushed to subscribers, with the row columns each event carries.
+# crud._touch reads them back with RETURNING while stamping the row versions.
+PUSH_COLUMNS: Dict[str, tuple] = {
+    "beds": ("id", "bed_number", "room_number", "is_occupied", "patient_id"),
+    "medicines": ("id", "name", "stock_quantity"),
+}
+
+# "memory" delivers events within this process; "postgres" relays them through
+# LISTEN/NOTIFY on the primary database so every uvicorn worker receives them
+EVENT_BROKER = os.getenv("EVENT_BROKER", "memory")
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "hms_events")
+# Distinct rows a subscriber may have pending before it is told to resync instead
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+# Comment lines sent on idle streams so proxies don't close them
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+
+# Sent instead of the pending events once a subscriber falls too far behind
+RESYNC = "resync"
+
+
+def change_event(table: str, version: int, row: Optional[dict] = None, deleted_id: Optional[int] = None) -> dict:
+    if row is None:
+        return {"topic": table, "id": deleted_id, "version": version, "deleted": True}
+    return {"topic": table, "id": row["id"], "version": version, "deleted": False, "row": row}
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue. A newer event for a row replaces the one still
+    pending, so a slow client only ever receives a row's latest state. When more
+    than `maxsize` rows are pending, they are dropped for a single resync event
+    telling the client to catch up through GET /<resource>/changes.
+    Only touched from the event loop thread.
+    """
+
+    def __init__(self, topics: Iterable[str], maxsize: int = EVENT_QUEUE_SIZE):
+        self.topics: Set[str] = set(topics)
+        self.maxsize = maxsize
+        self.coalesced = 0
+        self.resyncs = 0
+        self._pending: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def offer(self, change: dict) -> None:
+        if change["topic"] not in self.topics:
+            return
+        key = (change["topic"], change["id"])
+        if key in self._pending:
+            del self._pending[key]
+            self.coalesced += 1
+        elif len(self._pending) >= self.maxsize:
+            self._pending.clear()
+            self._resync = True
+            self.resyncs += 1
+        if not self._resync:
+            self._pending[key] = change
+        self._ready.set()
+
+    async def get(self) -> dict:
+        while not self._pending and not self._resync:
+            self._ready.clear()
+            await self._ready.wait()
+        if self._resync:
+            self._resync = False
+            return {"topic": RESYNC}
+        return self._pending.popitem(last=False)[1]
+
+
+class EventHub:
+    """In-process fan-out of change events to the subscriptions of this worker."""
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def _dispatch(self, changes: List[dict]) -> None:
+        self.published += len(changes)
+        for subscription in self._subscriptions:
+            for change in changes:
+                subscription.offer(change)
+
+    def publish(self, changes: List[dict]) -> None:
+        """Delivers events to local subscribers; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or not changes or loop.is_closed():
+            return
+        if _running_loop() is loop:
+            self._dispatch(changes)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, changes)
+
+    def stats(self) -> dict:
+        return {
+            "broker": EVENT_BROKER,
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "coalesced": sum(subscription.coalesced for subscription in self._subscriptions),
+            "resyncs": sum(subscription.resyncs for subscription in self._subscriptions),
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+event_hub = EventHub()
+
+
+# --- Transactional Emission --- #
+
+def _relayed_by_postgres(db: Session) -> bool:
+    return EVENT_BROKER == "postgres" and db.get_bind().dialect.name == "postgresql"
+
+
+def emit(db: Session, changes: List[dict]) -> None:
+    """
+    Queues change events on the session; they are published only once the
+    transaction commits and discarded on rollback. With the postgres broker they
+    are sent as NOTIFY within the transaction, which PostgreSQL also delivers
+    on commit only, to the listener of every worker including this one.
+    """
+    if not changes:
+        return
+    if _relayed_by_postgres(db):
+        for change in changes:
+            db.execute(select(func.pg_notify(EVENT_CHANNEL, json.dumps(change, default=str))))
+    else:
+        db.info.setdefault("pending_events", []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(db: Session):
+    event_hub.publish(db.info.pop("pending_events", []))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(db: Session):
+    db.info.pop("pending_events", None)
+
+
+# --- PostgreSQL Broker --- #
+
+async def listen_for_events(engine, stop: asyncio.Event) -> None:
+    """
+    Relays NOTIFY payloads from other workers (and this one) to the local hub
+    until `stop` is set. Holds one connection of `engine` for its lifetime.
+    """
+    def relay(connection, pid, channel, payload):
+        try:
+            event_hub.publish([json.loads(payload)])
+        except ValueError:
+            logger.warning("Ignoring malformed event payload on %s", channel)
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.add_listener(EVENT_CHANNEL, relay)
+        try:
+            await stop.wait()
+        finally:
+            await raw.remove_listener(EVENT_CHANNEL, relay)
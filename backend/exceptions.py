@@ -0,0 +1,54 @@
+# --- Domain Errors Raised by the CRUD Layer --- #
+
+class MedicineNotFoundError(LookupError):
+    """Raised when an operation refers to a medicine that does not exist."""
+
+    def __init__(self, medicine_id: int):
+        super().__init__(f"Medicine {medicine_id} not found.")
+        self.medicine_id = medicine_id
+
+
+class InsufficientStockError(Exception):
+    """Raised when a medicine does not have enough stock to cover a dispensation."""
+
+    def __init__(self, medicine_id: int, requested: int, available: int):
+        super().__init__(
+            f"Insufficient stock for medicine {medicine_id}: requested {requested}, available {available}."
+        )
+        self.medicine_id = medicine_id
+        self.requested = requested
+        self.available = available
+
+
+class DispensationBatchError(Exception):
+    """Raised when any item of a batch dispensation cannot be satisfied; nothing is applied."""
+
+    def __init__(self, errors: list):
+        super().__init__("Batch dispensation rejected.")
+        self.errors = errors
+
+
+class NoBedAvailableError(Exception):
+    """Raised when no free bed can be allocated in the requested room (or anywhere)."""
+
+    def __init__(self, room_number=None):
+        where = f"room {room_number}" if room_number is not None else "any room"
+        super().__init__(f"No free bed available in {where}.")
+        self.room_number = room_number
+
+
+class PatientAlreadyAdmittedError(Exception):
+    """Raised when allocating a bed to a patient who already occupies one."""
+
+    def __init__(self, patient_id: int):
+        super().__init__(f"Patient {patient_id} already occupies a bed.")
+        self.patient_id = patient_id
+
+
+class AppointmentConflictError(Exception):
+    """Raised when an appointment overlaps another active appointment of the same doctor."""
+
+    def __init__(self, doctor_name: str, conflicting_id: int):
+        super().__init__(f"{doctor_name} already has appointment {conflicting_id} at that time.")
+        self.doctor_name = doctor_name
+        self.conflicting_id = conflicting_id
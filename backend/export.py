@@ -0,0 +1,68 @@
+import csv
+import datetime
+import io
+import json
+import os
+from typing import AsyncIterator, Literal
+
+from fastapi.responses import StreamingResponse
+
+from .database import AsyncReadSessionLocal
+from .serialization import orjson
+
+# --- Streaming Exports --- #
+
+# Rows fetched from the server-side cursor, and written to the client, per chunk
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson_chunk(keys, rows) -> bytes:
+    if orjson is not None:
+        return b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+    return "".join(json.dumps(dict(zip(keys, row)), default=_json_default) + "\n" for row in rows).encode()
+
+
+def _csv_chunk(rows, header=None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(query, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    """
+    Streams the rows of `query` as NDJSON or CSV chunks through a server-side cursor.
+    The export opens its own read session, because it outlives the request's
+    dependencies, and holds at most one chunk of rows in memory at a time.
+    """
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _csv_chunk([], header=keys)
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(keys, rows)
+
+
+def export_response(query, fmt: ExportFormat, name: str) -> StreamingResponse:
+    filename = f"{name}-{datetime.datetime.utcnow():%Y%m%dT%H%M%S}.{fmt}"
+    return StreamingResponse(
+        stream_rows(query, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
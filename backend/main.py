@@ -1,17 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 
-from . import crud, models
-from .database import engine, get_db
+from . import crud, crud_async, models
+from .database import AsyncSessionLocal, SessionLocal, async_engine, async_read_engine, engine, get_db, read_engine
+from .bed_allocator import load_bed_index
 from .db.base import Base
-from .models import appointment, bed, dispensation, invoice, medicine, patient, permission, role, role_permission, staff
-from .routes import patients, appointments, beds, staff, auth, roles, invoices, medicines, dispensations
+from .db.upgrade import upgrade_schema
+from .etag import NotModified
+from .events import EVENT_BROKER, event_hub, listen_for_events
+from .pagination import NEXT_CURSOR_HEADER, InvalidCursor
+from .permissions import load_role_masks
+from .query_budget import SQL_STATEMENT_BUDGET, StatementBudgetMiddleware, install_statement_counter
+from .security import HashingPoolSaturated
+from .models import appointment, bed, dispensation, invoice, medicine, patient, permission, role, role_permission, staff, stock_movement, stock_snapshot, invoice_rollup, table_version
+from .routes import patients, appointments, beds, staff, auth, roles, invoices, medicines, dispensations, metrics, stats, billing, events
 from .schemas.staff import StaffCreate
 from .schemas.role import RoleCreate
 
-# Create all database tables
+# How often every medicine's stock is snapshotted for point-in-time queries; 0 disables it
+STOCK_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("STOCK_SNAPSHOT_INTERVAL_SECONDS", "3600"))
+# How often role permission masks are recompiled, picking up role changes made by other workers; 0 disables it
+ROLE_MASK_REFRESH_SECONDS = float(os.getenv("ROLE_MASK_REFRESH_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+# Create all database tables, then add what older releases' tables lack
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI()
 
@@ -28,8 +49,136 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Fail requests that issue more SQL statements than allowed (enabled in tests/CI)
+if SQL_STATEMENT_BUDGET:
+    install_statement_counter(engine, read_engine, async_engine, async_read_engine)
+    app.add_middleware(StatementBudgetMiddleware)
+
+
+@app.on_event("startup")
+def compile_permission_masks():
+    """Compiles every role into a permission bitmask before serving requests."""
+    db = SessionLocal()
+    try:
+        load_role_masks(db)
+    finally:
+        db.close()
+
+
+async def refresh_permission_masks_periodically():
+    while True:
+        await asyncio.sleep(ROLE_MASK_REFRESH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(load_role_masks)
+        except Exception:
+            logger.exception("Periodic permission mask refresh failed")
+
+
+@app.on_event("startup")
+async def start_permission_mask_refresh():
+    if ROLE_MASK_REFRESH_SECONDS > 0:
+        app.state.role_mask_refresh_task = asyncio.create_task(refresh_permission_masks_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_permission_mask_refresh():
+    task = getattr(app.state, "role_mask_refresh_task", None)
+    if task is not None:
+        task.cancel()
+
+
+@app.on_event("startup")
+def build_bed_index():
+    """Loads the free-bed index used to pick allocation candidates."""
+    db = SessionLocal()
+    try:
+        load_bed_index(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def seed_stock_snapshots():
+    """Gives medicines without a snapshot an opening one, so stock-level queries don't sum from zero."""
+    db = SessionLocal()
+    try:
+        crud.create_stock_snapshots(db, only_missing=True)
+    finally:
+        db.close()
+
+
+async def snapshot_stock_periodically():
+    while True:
+        await asyncio.sleep(STOCK_SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud_async.create_stock_snapshots(db)
+        except Exception:
+            logger.exception("Periodic stock snapshot failed")
+
+
+@app.on_event("startup")
+async def start_stock_snapshots():
+    if STOCK_SNAPSHOT_INTERVAL_SECONDS > 0:
+        app.state.stock_snapshot_task = asyncio.create_task(snapshot_stock_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_stock_snapshots():
+    task = getattr(app.state, "stock_snapshot_task", None)
+    if task is not None:
+        task.cancel()
+
+
+async def relay_events():
+    while not app.state.event_listener_stop.is_set():
+        try:
+            await listen_for_events(async_engine, app.state.event_listener_stop)
+        except Exception:
+            logger.exception("Event listener connection failed, reconnecting")
+            await asyncio.sleep(1)
+
+
+@app.on_event("startup")
+async def start_event_hub():
+    """Binds the change-event hub to the serving loop and, with the postgres broker, joins the other workers."""
+    event_hub.bind(asyncio.get_running_loop())
+    if EVENT_BROKER == "postgres" and async_engine.dialect.name == "postgresql":
+        app.state.event_listener_stop = asyncio.Event()
+        app.state.event_listener_task = asyncio.create_task(relay_events())
+
+
+@app.on_event("shutdown")
+async def stop_event_hub():
+    task = getattr(app.state, "event_listener_task", None)
+    if task is not None:
+        app.state.event_listener_stop.set()
+        await task
+
+
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_pool_saturated_handler(request: Request, exc: HashingPoolSaturated):
+    """Sheds password hashing load quickly instead of queueing it without bound."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": exc.etag})
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
 
 # Include all the routers
 app.include_router(auth.router)
@@ -39,8 +188,12 @@ app.include_router(appointments.router)
 app.include_router(beds.router)
 app.include_router(staff.router)
 app.include_router(invoices.router)
+app.include_router(billing.router)
 app.include_router(medicines.router)
 app.include_router(dispensations.router)
+app.include_router(metrics.router)
+app.include_router(stats.router)
+app.include_router(events.router)
 
 @app.get("/", tags=["Root"])
 async def read_root():
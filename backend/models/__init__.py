@@ -1 +1 @@
-from . import appointment, bed, dispensation, invoice, medicine, patient, role, staff, permission, role_permission
+from . import appointment, bed, dispensation, invoice, medicine, patient, role, staff, permission, role_permission, stock_movement, stock_snapshot, invoice_rollup, table_version, versioning
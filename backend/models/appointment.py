@@ -1,15 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+import os
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .versioning import VersionedMixin
+
+# Length of appointments booked without one, shared by the schemas and scheduling
+DEFAULT_APPOINTMENT_MINUTES = int(os.getenv("DEFAULT_APPOINTMENT_MINUTES", "30"))
 
-class Appointment(Base):
+class Appointment(VersionedMixin, Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Range scans over one doctor's schedule (conflict checks, availability)
+        Index("ix_appointments_doctor_name_date", "doctor_name", "appointment_date"),
+        Index("ix_appointments_patient_id_date", "patient_id", "appointment_date"),
+        Index("ix_appointments_status_date", "status", "appointment_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
     doctor_name = Column(String, index=True)
-    appointment_date = Column(DateTime)
+    appointment_date = Column(DateTime, index=True)
+    duration_minutes = Column(Integer, nullable=False, default=DEFAULT_APPOINTMENT_MINUTES, server_default=str(DEFAULT_APPOINTMENT_MINUTES))
     reason = Column(String)
     status = Column(String, default="Scheduled")
 
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Bed(Base):
+class Bed(VersionedMixin, Base):
     __tablename__ = "beds"
+    __table_args__ = (
+        # Free or occupied beds of a room
+        Index("ix_beds_room_number_is_occupied", "room_number", "is_occupied"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bed_number = Column(String, index=True)
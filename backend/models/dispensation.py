@@ -1,18 +1,25 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
 from sqlalchemy.orm import relationship
 import datetime
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Dispensation(Base):
+class Dispensation(VersionedMixin, Base):
     __tablename__ = "dispensations"
+    __table_args__ = (
+        # A patient's or a medicine's dispensation history, ordered by date
+        Index("ix_dispensations_patient_id_date_dispensed", "patient_id", "date_dispensed"),
+        Index("ix_dispensations_medicine_id_date_dispensed", "medicine_id", "date_dispensed"),
+        Index("ix_dispensations_staff_id", "staff_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
     medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
     staff_id = Column(Integer, ForeignKey("staff.id", ondelete="SET NULL"), nullable=True)
     quantity_dispensed = Column(Integer, nullable=False)
-    date_dispensed = Column(DateTime, default=datetime.datetime.utcnow)
+    date_dispensed = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     notes = Column(String, nullable=True)
 
     patient = relationship("Patient", back_populates="dispensations")
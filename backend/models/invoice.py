@@ -1,17 +1,28 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 import datetime
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Invoice(Base):
+# Statuses of invoices that still await payment
+UNPAID_INVOICE_STATUSES = ("Unpaid", "Overdue")
+
+class Invoice(VersionedMixin, Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Filtered listings ordered by date, e.g. unpaid invoices or a patient's invoices
+        Index("ix_invoices_status_date_issued", "status", "date_issued"),
+        Index("ix_invoices_patient_id_date_issued", "patient_id", "date_issued"),
+        # Listings sorted by amount, keyset-paginated over (amount, id)
+        Index("ix_invoices_amount_id", "amount", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=False)
-    date_issued = Column(DateTime, default=datetime.datetime.utcnow)
+    date_issued = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     status = Column(String, default="Unpaid") # e.g., Unpaid, Paid, Overdue
 
     patient = relationship("Patient", back_populates="invoices")
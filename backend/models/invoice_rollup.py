@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+
+from ..db.base import Base
+
+class InvoiceDailyRollup(Base):
+    """Number and total amount of the invoices issued on one day, per current status."""
+    __tablename__ = "invoice_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    amount_total = Column(Float, nullable=False, default=0.0)
+
+
+class PatientBalance(Base):
+    """Running billing totals of one patient; outstanding covers the unpaid invoices."""
+    __tablename__ = "patient_balances"
+
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True)
+    billed_total = Column(Float, nullable=False, default=0.0)
+    outstanding_amount = Column(Float, nullable=False, default=0.0, index=True)
+    outstanding_count = Column(Integer, nullable=False, default=0)
@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index
 from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Medicine(Base):
+class Medicine(VersionedMixin, Base):
     __tablename__ = "medicines"
+    __table_args__ = (
+        Index("ix_medicines_manufacturer_id", "manufacturer", "id"),
+        # name_prefix filters: LIKE 'x%' can only use a text_pattern_ops index on PostgreSQL
+        Index("ix_medicines_name_pattern", "name", postgresql_ops={"name": "text_pattern_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, unique=True)
     manufacturer = Column(String)
-    stock_quantity = Column(Integer, default=0)
+    stock_quantity = Column(Integer, default=0, index=True)
     unit_price = Column(Float)
 
     dispensations = relationship("Dispensation", back_populates="medicine")
+    movements = relationship("StockMovement", back_populates="medicine", passive_deletes=True)
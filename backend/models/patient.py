@@ -1,11 +1,24 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, Date, DDL, Index, event
 from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
+# Columns matched by the patient search; on PostgreSQL each gets a trigram index
+SEARCH_COLUMNS = ("first_name", "last_name", "contact_number", "email")
 
-class Patient(Base):
+
+class Patient(VersionedMixin, Base):
     __tablename__ = "patients"
+    __table_args__ = tuple(
+        Index(
+            f"ix_patients_{column}_trgm",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql")
+        for column in SEARCH_COLUMNS
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True)
@@ -18,3 +31,11 @@ class Patient(Base):
     bed = relationship("Bed", back_populates="patient", uselist=False)
     invoices = relationship("Invoice", back_populates="patient")
     dispensations = relationship("Dispensation", back_populates="patient")
+
+
+# The trigram indexes need the pg_trgm extension
+event.listen(
+    Patient.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
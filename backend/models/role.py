@@ -3,8 +3,9 @@ from sqlalchemy.orm import relationship
 
 from sqlalchemy.orm import relationship
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Role(Base):
+class Role(VersionedMixin, Base):
     __tablename__ = "roles"
 
     id = Column(Integer, primary_key=True, index=True)
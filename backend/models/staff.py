@@ -2,8 +2,9 @@ from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .versioning import VersionedMixin
 
-class Staff(Base):
+class Staff(VersionedMixin, Base):
     __tablename__ = "staff"
 
     id = Column(Integer, primary_key=True, index=True)
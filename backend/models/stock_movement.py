@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+import datetime
+
+from ..db.base import Base
+
+# Kinds of stock movement recorded in the ledger
+RESTOCK = "restock"
+DISPENSE = "dispense"
+ADJUSTMENT = "adjustment"
+
+class StockMovement(Base):
+    """An append-only ledger entry; quantity is the signed change in stock."""
+    __tablename__ = "stock_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    dispensation_id = Column(Integer, ForeignKey("dispensations.id", ondelete="SET NULL"), nullable=True)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    medicine = relationship("Medicine", back_populates="movements")
+
+    __table_args__ = (
+        Index("ix_stock_movements_medicine_id_id", "medicine_id", "id"),
+        Index("ix_stock_movements_medicine_id_created_at", "medicine_id", "created_at"),
+    )
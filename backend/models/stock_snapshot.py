@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+import datetime
+
+from ..db.base import Base
+
+class StockSnapshot(Base):
+    """Stock level of a medicine at a point in time, covering every movement up to last_movement_id."""
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id", ondelete="CASCADE"), nullable=False)
+    stock_quantity = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_stock_snapshots_medicine_id_taken_at", "medicine_id", "taken_at"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+
+from ..db.base import Base
+
+class TableVersion(Base):
+    """
+    A counter bumped by every API write to a table, versioning its rows for delta
+    sync and cached list responses. Not used on PostgreSQL, where the versions are
+    transaction ids (see crud._touch).
+    """
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
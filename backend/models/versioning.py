@@ -0,0 +1,30 @@
+import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
+
+from ..db.base import Base
+
+
+class VersionedMixin:
+    """
+    Columns read by the delta-sync API. The crud layer stamps every row it writes
+    with the version its transaction gave the table (see crud._touch); rows written
+    before versioning was introduced keep version 0. Versions are transaction ids
+    on PostgreSQL, hence 64 bits.
+    """
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    row_version = Column(BigInteger, nullable=False, default=0, server_default="0", index=True)
+
+
+class Tombstone(Base):
+    """Records a deleted row so delta-sync clients learn about the deletion."""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_table_name_version", "table_name", "version"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
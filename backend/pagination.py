@@ -0,0 +1,176 @@
+import base64
+import datetime
+import json
+import os
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, or_, tuple_
+
+# --- Keyset (Cursor) Pagination --- #
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not issued by this API."""
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    return value
+
+def _load_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.datetime.fromisoformat(value["dt"])
+    if isinstance(value, dict) and "d" in value:
+        return datetime.date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes the sort key of the last row of a page into an opaque cursor."""
+    raw = json.dumps([_dump_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed pagination cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Pagination cursor does not match this listing.")
+    try:
+        return tuple(_load_value(value) for value in values)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed pagination cursor.")
+
+
+def _nullable(key) -> bool:
+    return getattr(getattr(key, "expression", key), "nullable", False)
+
+def _matches_type(value: Any, key) -> bool:
+    """Whether a decoded cursor value can be compared with a key column."""
+    if value is None:
+        return _nullable(key)
+    try:
+        expected = key.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) and expected is not bool:
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    if expected is datetime.date:
+        return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+    return isinstance(value, expected)
+
+
+def _after_nullable(keys: Sequence, after: tuple, descending: bool):
+    # Lexicographic "after" over keys ordered NULLS LAST: NULL equals NULL and sorts
+    # after every value. Row-value comparison cannot express either.
+    terms = []
+    for i, (key, value) in enumerate(zip(keys, after)):
+        if value is not None:
+            beyond = key < value if descending else key > value
+            if _nullable(key):
+                beyond = or_(beyond, key.is_(None))
+            terms.append(and_(*(
+                prior.is_(None) if prior_value is None else prior == prior_value
+                for prior, prior_value in zip(keys[:i], after[:i])
+            ), beyond))
+    return or_(*terms) if terms else false()
+
+
+def paginate(query, keys: Sequence, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, descending: bool = False):
+    """
+    Orders a query by the given key columns and applies one page of pagination.
+    The last key must be unique (normally the primary key) so the order is total.
+    With a cursor, rows after the cursor's key are selected through the index
+    (keyset pagination), so every page costs the same; otherwise the legacy
+    offset is applied. Rows whose nullable key is NULL come last in either
+    direction.
+    """
+    order = [key.desc() if descending else key.asc() for key in keys]
+    query = query.order_by(*(
+        clause.nulls_last() if _nullable(key) else clause for key, clause in zip(keys, order)
+    ))
+    if cursor:
+        after = decode_cursor(cursor, len(keys))
+        # A mistyped value would match nothing on SQLite and fail the query on PostgreSQL
+        if not all(_matches_type(value, key) for value, key in zip(after, keys)):
+            raise InvalidCursor("Pagination cursor does not match this listing.")
+        if any(_nullable(key) for key in keys):
+            condition = _after_nullable(keys, after, descending)
+        elif len(keys) == 1:
+            condition = keys[0] < after[0] if descending else keys[0] > after[0]
+        else:
+            condition = tuple_(*keys) < tuple_(*after) if descending else tuple_(*keys) > tuple_(*after)
+        query = query.filter(condition)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence, limit: int, key_names: Sequence[str] = ("id",)) -> Optional[str]:
+    """Returns the cursor for the page after `items`, or None when this was the last page."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor([last[name] for name in key_names])
+    return encode_cursor([getattr(last, name) for name in key_names])
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def set_next_cursor(response, items: Sequence, limit: int, key_names: Sequence[str] = ("id",)) -> None:
+    """Advertises the next page's cursor on a list response."""
+    cursor = next_cursor(items, limit, key_names)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+# --- Delta-Sync Tokens --- #
+
+def encode_sync_token(version: int, after_id: Optional[int] = None) -> str:
+    """
+    A delta-sync position: every row up to `version` was sent, or, with
+    `after_id`, every row ordered before (version, after_id).
+    """
+    return encode_cursor([version, after_id])
+
+def decode_sync_token(token: Optional[str]) -> tuple:
+    """Parses a `since` token into (version, after_id); plain versions from older clients are accepted."""
+    if token is None:
+        return -1, None
+    try:
+        return int(token), None
+    except ValueError:
+        pass
+    version, after_id = decode_cursor(token, 2)
+    if type(version) is not int or not (after_id is None or type(after_id) is int):
+        raise InvalidCursor("Malformed sync token.")
+    return version, after_id
+
+
+# --- Multi-Get --- #
+
+# Most ids a single `ids=` multi-get may ask for
+MAX_IDS_PER_REQUEST = int(os.getenv("MAX_IDS_PER_REQUEST", "500"))
+
+def requested_ids(ids: Optional[str] = None) -> Optional[List[int]]:
+    """
+    Dependency parsing the `ids=1,5,9` multi-get parameter of a list endpoint into
+    ids in request order, without repeats; None when the parameter is absent.
+    """
+    if ids is None:
+        return None
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="`ids` must be a comma-separated list of integers")
+    if len(parsed) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IDS_PER_REQUEST} ids can be requested at once")
+    return parsed
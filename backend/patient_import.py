@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import os
+from typing import IO, Iterable, Iterator, List, Literal, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import crud
+from .database import SessionLocal
+from .schemas.patient import PatientCreate, PatientImportError, PatientImportReport
+
+# --- Bulk Patient Import --- #
+
+# Records validated, checked and loaded together; each chunk commits on its own
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+# Rejected rows listed in a report; further failures are only counted
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+ImportFormat = Literal["csv", "ndjson"]
+
+
+def detect_format(filename: Optional[str]) -> ImportFormat:
+    return "ndjson" if filename and filename.lower().endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+def iter_records(stream: IO[str], fmt: ImportFormat) -> Iterator[object]:
+    """Yields the records of a CSV (with a header row) or NDJSON text stream, one at a time."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+class _Report:
+    def __init__(self):
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[PatientImportError] = []
+
+    def reject(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(PatientImportError(row=row, error=error))
+
+    def build(self) -> PatientImportReport:
+        return PatientImportReport(
+            received=self.received,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors),
+        )
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+
+def _reject_taken(db: Session, row: int, patient: PatientCreate, report: _Report):
+    taken_emails, _ = crud.get_existing_patient_keys(db, [patient.email], [patient.contact_number])
+    db.rollback()
+    field = "email" if patient.email in taken_emails else "contact_number"
+    report.reject(row, f"{field}: {getattr(patient, field)} is already registered")
+
+
+def _insert_rows(db: Session, rows: List[tuple], report: _Report):
+    """Inserts rows one at a time, reporting each one whose keys were taken meanwhile."""
+    for row, patient in rows:
+        try:
+            crud.bulk_insert_patients(db, [patient])
+        except IntegrityError:
+            _reject_taken(db, row, patient, report)
+        else:
+            report.imported += 1
+
+
+def _load_chunk(db: Session, chunk: List[tuple], report: _Report):
+    """
+    Rejects rows whose email or contact number is taken, then bulk-inserts the rest.
+    A chunk that still collides after a second check, because concurrent writers
+    keep taking its keys, is inserted row by row instead.
+    """
+    for attempt in range(2):
+        taken_emails, taken_contacts = crud.get_existing_patient_keys(
+            db, [patient.email for _, patient in chunk], [patient.contact_number for _, patient in chunk],
+        )
+        db.rollback() # end the read transaction; the insert runs in its own
+        accepted = []
+        for row, patient in chunk:
+            if patient.email in taken_emails:
+                report.reject(row, f"email: {patient.email} is already registered")
+            elif patient.contact_number in taken_contacts:
+                report.reject(row, f"contact_number: {patient.contact_number} is already registered")
+            else:
+                accepted.append((row, patient))
+        try:
+            crud.bulk_insert_patients(db, [patient for _, patient in accepted])
+        except IntegrityError:
+            # A concurrent writer took some of the keys since the check; check again
+            if attempt:
+                _insert_rows(db, accepted, report)
+                return
+            chunk = accepted
+            continue
+        report.imported += len(accepted)
+        return
+
+
+def import_patients(db: Session, records: Iterable[object], chunk_size: int = IMPORT_CHUNK_ROWS) -> PatientImportReport:
+    """
+    Validates records against PatientCreate and loads them chunk by chunk.
+    Invalid rows and rows whose email or contact number is already taken, in the
+    database or earlier in the file, are reported and skipped; the rest is loaded.
+    """
+    report = _Report()
+    seen_emails, seen_contacts = set(), set()
+    chunk: List[tuple] = []
+    for row, record in enumerate(records, start=1):
+        report.received += 1
+        if isinstance(record, Exception):
+            report.reject(row, f"invalid JSON: {record}")
+            continue
+        if not isinstance(record, dict):
+            report.reject(row, "expected an object")
+            continue
+        try:
+            patient = PatientCreate(**record)
+        except ValidationError as exc:
+            report.reject(row, _validation_message(exc))
+            continue
+        if patient.email in seen_emails:
+            report.reject(row, f"email: {patient.email} appears earlier in the file")
+            continue
+        if patient.contact_number in seen_contacts:
+            report.reject(row, f"contact_number: {patient.contact_number} appears earlier in the file")
+            continue
+        seen_emails.add(patient.email)
+        seen_contacts.add(patient.contact_number)
+        chunk.append((row, patient))
+        if len(chunk) >= chunk_size:
+            _load_chunk(db, chunk, report)
+            chunk = []
+    if chunk:
+        _load_chunk(db, chunk, report)
+    return report.build()
+
+
+def import_patients_file(stream: IO[bytes], fmt: ImportFormat, chunk_size: int = IMPORT_CHUNK_ROWS) -> PatientImportReport:
+    """
+    Imports a UTF-8 CSV or NDJSON byte stream through the sync engine, so that COPY
+    is available; blocking, so the API runs it in a worker thread.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    db = SessionLocal()
+    try:
+        return import_patients(db, iter_records(text, fmt), chunk_size=chunk_size)
+    finally:
+        db.close()
+        text.detach() # leave the underlying stream open for its owner
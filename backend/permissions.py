@@ -0,0 +1,93 @@
+import threading
+from typing import Dict, Iterable
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+# --- Permission Registry --- #
+
+# Each permission owns a fixed bit given by its position in this list.
+# Only ever append to it: reordering would change the meaning of issued tokens.
+PERMISSIONS = [
+    "create_staff", "read_staff", "update_staff", "delete_staff",
+    "create_role", "read_roles", "update_role", "delete_role",
+    "create_patient", "read_patients", "update_patient", "delete_patient",
+    "create_appointment", "read_appointments", "update_appointment", "delete_appointment",
+    "create_bed", "read_beds", "update_bed", "delete_bed",
+    "create_invoice", "read_invoices", "update_invoice",
+    "create_medicine", "read_medicines", "update_medicine", "delete_medicine", "restock_medicine",
+    "create_dispensation", "read_dispensations"
+]
+
+PERMISSION_BITS: Dict[str, int] = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+
+
+def permission_bit(name: str) -> int:
+    """Returns the bit assigned to a permission name."""
+    try:
+        return PERMISSION_BITS[name]
+    except KeyError:
+        raise ValueError(f"Unknown permission '{name}'. Add it to backend.permissions.PERMISSIONS.")
+
+
+def compile_mask(names: Iterable[str]) -> int:
+    """Compiles permission names into a bitmask, ignoring names outside the registry."""
+    mask = 0
+    for name in names:
+        mask |= PERMISSION_BITS.get(name, 0)
+    return mask
+
+
+# --- Compiled Role Masks --- #
+
+_role_masks: Dict[int, int] = {}
+_role_masks_lock = threading.Lock()
+
+
+def compile_role(role: 'models.role.Role') -> int:
+    """Compiles a loaded Role into a bitmask and records it in the registry."""
+    mask = compile_mask(link.permission.name for link in role.permissions)
+    with _role_masks_lock:
+        _role_masks[role.id] = mask
+    return mask
+
+
+def get_role_mask(role_id: int):
+    """Returns the compiled mask for a role, or None if it has not been compiled."""
+    return _role_masks.get(role_id)
+
+
+def forget_role(role_id: int) -> None:
+    """Marks a deleted role: it grants nothing, even to tokens that embed an older mask."""
+    with _role_masks_lock:
+        _role_masks[role_id] = 0
+
+
+def _roles_with_permissions(db: Session):
+    return db.query(models.role.Role).options(
+        joinedload(models.role.Role.permissions).joinedload(models.role_permission.RolePermission.permission)
+    )
+
+
+def load_role_masks(db: Session) -> None:
+    """
+    Compiles every role in the database. Called at application startup and then
+    periodically, which is how role changes made by other workers reach this one.
+    Roles known here but gone from the database are kept as deleted (mask 0).
+    """
+    roles = _roles_with_permissions(db).all()
+    masks = {role.id: compile_mask(link.permission.name for link in role.permissions) for role in roles}
+    with _role_masks_lock:
+        for role_id in _role_masks:
+            _role_masks[role_id] = 0
+        _role_masks.update(masks)
+
+
+def refresh_role_mask(db: Session, role_id: int) -> None:
+    """Recompiles a single role after it has been created or changed."""
+    role = _roles_with_permissions(db).filter(models.role.Role.id == role_id).first()
+    if role is None:
+        forget_role(role_id)
+    else:
+        compile_role(role)
@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from . import models
+from .cache import TTLCache
+from .permissions import compile_role, permission_bit
+
+# --- Principal Cache Settings --- #
+
+# Each worker holds its own cache, and staff or role writes only clear the cache of the
+# worker that served them: on the others, a deleted or demoted staff member keeps their
+# previous access for up to this long.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "10"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "4096"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """An immutable, session-independent snapshot of an authenticated staff member."""
+    id: int
+    email: str
+    role_id: Optional[int]
+    role_name: Optional[str]
+    permission_mask: int
+
+    def has_permission(self, name: str) -> bool:
+        return bool(self.permission_mask & permission_bit(name))
+
+    @classmethod
+    def from_staff(cls, staff: 'models.staff.Staff') -> 'Principal':
+        role = staff.role
+        return cls(
+            id=staff.id,
+            email=staff.email,
+            role_id=role.id if role else None,
+            role_name=role.name if role else None,
+            permission_mask=compile_role(role) if role else 0,
+        )
+
+
+# Keyed by (token subject, token issue time); cleared whenever staff or roles change.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
@@ -0,0 +1,68 @@
+import contextvars
+import os
+
+from sqlalchemy import event
+
+# --- SQL Statement Budget --- #
+
+# Maximum number of SQL statements a single request may issue; 0 disables the guard.
+# Test and CI environments set this so that a regression to per-row lazy loading
+# (N+1 queries) fails loudly instead of silently slowing list endpoints down.
+SQL_STATEMENT_BUDGET = int(os.getenv("SQL_STATEMENT_BUDGET", "0"))
+STATEMENT_COUNT_HEADER = "X-SQL-Statements"
+
+_statement_counter = contextvars.ContextVar("statement_counter", default=None)
+
+
+class StatementBudgetExceeded(RuntimeError):
+    """Raised when a request issues more SQL statements than the configured budget."""
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statement_counter.get()
+    if counter is None:
+        return
+    counter[0] += 1
+    if counter[0] > SQL_STATEMENT_BUDGET:
+        raise StatementBudgetExceeded(
+            f"Request exceeded its budget of {SQL_STATEMENT_BUDGET} SQL statements; "
+            f"statement {counter[0]} was: {statement}"
+        )
+
+
+def install_statement_counter(*engines) -> None:
+    """Counts statements executed on the given (sync or async) engines against the request budget."""
+    seen = set()
+    for engine in engines:
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if id(sync_engine) in seen:
+            continue
+        seen.add(id(sync_engine))
+        event.listen(sync_engine, "before_cursor_execute", _count_statement)
+
+
+class StatementBudgetMiddleware:
+    """ASGI middleware that opens a statement counter per request and reports it in a header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        token = _statement_counter.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((STATEMENT_COUNT_HEADER.lower().encode(), str(counter[0]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _statement_counter.reset(token)
@@ -0,0 +1,34 @@
+import logging
+import os
+from typing import Optional
+
+from .cache import CacheBackend, LocalCacheBackend, ReadThroughCache, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+# --- Reference Data Cache Settings --- #
+
+# Medicines and roles are read on nearly every page but change rarely
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "30"))
+REFERENCE_CACHE_MAX_SIZE = int(os.getenv("REFERENCE_CACHE_MAX_SIZE", "512"))
+# "none" keeps each worker's cache to itself; "redis" shares entries and invalidations
+# between workers through READ_CACHE_REDIS_URL; "local" is an in-process stand-in for it
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND", "none")
+READ_CACHE_REDIS_URL = os.getenv("READ_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+def _shared_backend() -> Optional[CacheBackend]:
+    if READ_CACHE_BACKEND == "local":
+        return LocalCacheBackend()
+    if READ_CACHE_BACKEND == "redis":
+        try:
+            return RedisCacheBackend(READ_CACHE_REDIS_URL)
+        except ImportError: # the redis package is optional
+            logger.warning("READ_CACHE_BACKEND=redis needs the redis package; caching per worker instead")
+    return None
+
+
+_backend = _shared_backend()
+
+medicine_cache = ReadThroughCache("medicines", REFERENCE_CACHE_MAX_SIZE, REFERENCE_CACHE_TTL_SECONDS, _backend)
+role_cache = ReadThroughCache("roles", REFERENCE_CACHE_MAX_SIZE, REFERENCE_CACHE_TTL_SECONDS, _backend)
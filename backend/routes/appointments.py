@@ -1,10 +1,19 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud
-from ..database import get_db
-from ..schemas.appointment import Appointment, AppointmentCreate
+from .. import crud, crud_async
+from ..auth import has_permission
+from ..database import get_async_db, get_async_read_db
+from ..export import ExportFormat, export_response
+from ..etag import conditional_get
+from ..pagination import requested_ids, set_next_cursor
+from ..exceptions import AppointmentConflictError
+from ..scheduling import DEFAULT_APPOINTMENT_MINUTES, MAX_AVAILABILITY_DAYS
+from ..schemas.appointment import Appointment, AppointmentCreate, AppointmentFilter, FreeSlot
+from ..schemas.sync import ChangeSet
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/appointments",
@@ -12,40 +21,99 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[Appointment])
-def get_all_appointments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[Appointment], dependencies=[Depends(conditional_get("appointments", "patients"))])
+async def get_all_appointments(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: AppointmentFilter = Depends(), ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all appointments.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    appointments = crud.get_appointments(db, skip=skip, limit=limit)
-    return appointments
+    if ids is not None:
+        return trusted_json(await crud_async.get_appointments_by_ids(db, ids=ids), response)
+    appointments = await crud_async.get_appointments(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
+    set_next_cursor(response, appointments, limit, filters.cursor_keys())
+    return trusted_json(appointments, response)
+
+
+@router.get("/changes", response_model=ChangeSet[Appointment], dependencies=[Depends(has_permission("read_appointments"))])
+async def get_appointment_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: appointments created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_appointment_changes(db, since=since, limit=limit)
+
+
+@router.get("/availability", response_model=List[FreeSlot], dependencies=[Depends(has_permission("read_appointments"))])
+async def get_doctor_availability(
+    doctor: str,
+    start: datetime.datetime = Query(..., alias="from"),
+    end: datetime.datetime = Query(..., alias="to"),
+    min_minutes: int = Query(DEFAULT_APPOINTMENT_MINUTES, gt=0),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    List the free intervals of at least `min_minutes` in a doctor's schedule between `from` and `to`.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    if end - start > datetime.timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"The window may span at most {MAX_AVAILABILITY_DAYS} days")
+    return await crud_async.get_doctor_availability(db, doctor, start, end, min_minutes)
+
+
+@router.get("/export", dependencies=[Depends(has_permission("read_appointments"))])
+async def export_appointments(format: ExportFormat = "ndjson", filters: AppointmentFilter = Depends()):
+    """
+    Stream every appointment matching the filters as NDJSON or CSV, in constant memory.
+    """
+    return export_response(crud.appointment_export_query(filters), format, "appointments")
 
 
 @router.post("/", response_model=Appointment)
-def create_new_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
+async def create_new_appointment(appointment: AppointmentCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new appointment.
+    Overlapping an active appointment of the same doctor is rejected with 409.
     """
-    return crud.create_appointment(db=db, appointment=appointment)
+    try:
+        return await crud_async.create_appointment(db=db, appointment=appointment)
+    except AppointmentConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.delete("/{appointment_id}", response_model=Appointment)
-def delete_appointment_by_id(appointment_id: int, db: Session = Depends(get_db)):
+async def delete_appointment_by_id(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete an appointment by ID.
     """
-    db_appointment = crud.delete_appointment(db, appointment_id=appointment_id)
+    db_appointment = await crud_async.delete_appointment(db, appointment_id=appointment_id)
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return db_appointment
 
 
 @router.put("/{appointment_id}", response_model=Appointment)
-def update_appointment_by_id(appointment_id: int, appointment: AppointmentCreate, db: Session = Depends(get_db)):
+async def update_appointment_by_id(appointment_id: int, appointment: AppointmentCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Update an appointment by ID.
     """
-    db_appointment = crud.update_appointment(db, appointment_id=appointment_id, appointment=appointment)
+    try:
+        db_appointment = await crud_async.update_appointment(db, appointment_id=appointment_id, appointment=appointment)
+    except AppointmentConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if db_appointment is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return db_appointment
+
+
+@router.get("/{appointment_id}", response_model=Appointment, dependencies=[Depends(has_permission("read_appointments"))])
+async def get_appointment_by_id(appointment_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve an appointment by ID.
+    """
+    db_appointment = await crud_async.get_appointment(db, appointment_id=appointment_id)
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return db_appointment
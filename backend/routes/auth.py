@@ -2,31 +2,45 @@ from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud
-from ..auth import create_access_token, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
-from ..database import get_db
+from .. import crud_async
+from ..auth import create_access_token, token_claims_for, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..database import get_async_db
+from ..principal import Principal
+from ..security import verify_and_update_password_async
 
 router = APIRouter(
     tags=["Authentication"],
 )
 
 @router.post("/token", response_model=dict)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """
     Provides a JWT token for valid user credentials.
+    Password verification runs on the bounded hashing pool, so a login burst
+    gets a fast 503 instead of stalling other endpoints.
     """
-    user = crud.get_staff_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = await crud_async.get_staff_by_email(db, email=form_data.username)
+    if not user:
+        raise credentials_exception
+    verified, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not verified:
+        raise credentials_exception
+
+    principal = Principal.from_staff(user)
+    if new_hash:
+        # The stored hash used an outdated work factor; replace it transparently
+        await crud_async.update_staff_password_hash(db, staff_id=user.id, hashed_password=new_hash)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "role": user.role.name},
+        data=token_claims_for(principal),
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,10 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud
-from ..database import get_db
-from ..schemas.bed import Bed, BedCreate, BedUpdate
+from .. import crud_async
+from ..auth import has_permission
+from ..database import get_async_db, get_async_read_db
+from ..etag import conditional_get
+from ..pagination import requested_ids, set_next_cursor
+from ..exceptions import NoBedAvailableError, PatientAlreadyAdmittedError
+from ..schemas.bed import Bed, BedAllocate, BedCreate, BedFilter, BedUpdate
+from ..schemas.sync import ChangeSet
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/beds",
@@ -12,40 +18,92 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[Bed])
-def get_all_beds(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[Bed], dependencies=[Depends(conditional_get("beds", "patients"))])
+async def get_all_beds(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: BedFilter = Depends(), ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all beds.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    beds = crud.get_beds(db, skip=skip, limit=limit)
-    return beds
+    if ids is not None:
+        return trusted_json(await crud_async.get_beds_by_ids(db, ids=ids), response)
+    beds = await crud_async.get_beds(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
+    set_next_cursor(response, beds, limit, filters.cursor_keys())
+    return trusted_json(beds, response)
+
+
+@router.get("/changes", response_model=ChangeSet[Bed], dependencies=[Depends(has_permission("read_beds"))])
+async def get_bed_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: beds created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_bed_changes(db, since=since, limit=limit)
 
 
 @router.post("/", response_model=Bed)
-def create_new_bed(bed: BedCreate, db: Session = Depends(get_db)):
+async def create_new_bed(bed: BedCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new bed.
     """
-    return crud.create_bed(db=db, bed=bed)
+    return await crud_async.create_bed(db=db, bed=bed)
+
+
+@router.post("/allocate", response_model=Bed, dependencies=[Depends(has_permission("update_bed"))])
+async def allocate_bed(allocation: BedAllocate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Allocate a free bed to a patient, in the given room or in any room.
+    Concurrent allocations never receive the same bed.
+    """
+    try:
+        db_bed = await crud_async.allocate_bed(db, patient_id=allocation.patient_id, room_number=allocation.room_number)
+    except (NoBedAvailableError, PatientAlreadyAdmittedError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if db_bed is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return db_bed
+
+
+@router.post("/{bed_id}/discharge", response_model=Bed, dependencies=[Depends(has_permission("update_bed"))])
+async def discharge_bed(bed_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Discharge the patient occupying a bed, making the bed free again.
+    """
+    db_bed = await crud_async.discharge_bed(db, bed_id=bed_id)
+    if db_bed is None:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    return db_bed
 
 
 @router.put("/{bed_id}", response_model=Bed)
-def update_bed_by_id(bed_id: int, bed: BedUpdate, db: Session = Depends(get_db)):
+async def update_bed_by_id(bed_id: int, bed: BedUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Update a bed by ID, used for assigning or discharging a patient.
     """
-    db_bed = crud.update_bed(db, bed_id=bed_id, bed=bed)
+    db_bed = await crud_async.update_bed(db, bed_id=bed_id, bed=bed)
     if db_bed is None:
         raise HTTPException(status_code=404, detail="Bed not found")
     return db_bed
 
 
 @router.delete("/{bed_id}", response_model=Bed)
-def delete_bed_by_id(bed_id: int, db: Session = Depends(get_db)):
+async def delete_bed_by_id(bed_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a bed by ID.
     """
-    db_bed = crud.delete_bed(db, bed_id=bed_id)
+    db_bed = await crud_async.delete_bed(db, bed_id=bed_id)
+    if db_bed is None:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    return db_bed
+
+
+@router.get("/{bed_id}", response_model=Bed, dependencies=[Depends(has_permission("read_beds"))])
+async def get_bed_by_id(bed_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a bed by ID.
+    """
+    db_bed = await crud_async.get_bed(db, bed_id=bed_id)
     if db_bed is None:
         raise HTTPException(status_code=404, detail="Bed not found")
     return db_bed
@@ -0,0 +1,66 @@
+import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud_async
+from ..database import get_async_db, get_async_read_db
+from ..pagination import set_next_cursor
+from ..schemas.billing import AgingBucket, PatientBalance, RevenuePeriod
+from ..auth import get_current_user, has_permission
+from ..serialization import trusted_json
+
+router = APIRouter(
+    prefix="/billing",
+    tags=["Billing"],
+    dependencies=[Depends(get_current_user)]
+)
+
+@router.get("/revenue", response_model=List[RevenuePeriod], dependencies=[Depends(has_permission("read_invoices"))])
+async def get_revenue(
+    granularity: Literal["day", "month"] = "day",
+    start: Optional[datetime.date] = Query(None, alias="from"),
+    end: Optional[datetime.date] = Query(None, alias="to"),
+    invoice_status: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Invoiced amount per day or month and status, with a running total per status.
+    `from` is inclusive and `to` exclusive; both are optional.
+    """
+    return await crud_async.get_revenue(db, granularity=granularity, start=start, end=end, status=invoice_status)
+
+@router.get("/aging", response_model=List[AgingBucket], dependencies=[Depends(has_permission("read_invoices"))])
+async def get_invoice_aging(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Unpaid invoices grouped by days since issue: 0-30, 31-60, 61-90 and 90+.
+    """
+    return await crud_async.get_invoice_aging(db, now=datetime.datetime.utcnow())
+
+@router.get("/balances", response_model=List[PatientBalance], dependencies=[Depends(has_permission("read_invoices"))])
+async def get_patient_balances(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, min_outstanding: float = 0.0, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Patients with an outstanding balance, largest first.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination.
+    """
+    balances = await crud_async.get_patient_balances(db, skip=skip, limit=limit, cursor=cursor, min_outstanding=min_outstanding)
+    set_next_cursor(response, balances, limit, ("outstanding_amount", "patient_id"))
+    return trusted_json(balances, response)
+
+@router.get("/balances/{patient_id}", response_model=PatientBalance, dependencies=[Depends(has_permission("read_invoices"))])
+async def get_patient_balance(patient_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    A patient's billed total and outstanding balance.
+    """
+    db_balance = await crud_async.get_patient_balance(db, patient_id=patient_id)
+    if db_balance is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return db_balance
+
+@router.post("/rollups/rebuild", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(has_permission("update_invoice"))])
+async def rebuild_invoice_rollups(db: AsyncSession = Depends(get_async_db)):
+    """
+    Recompute the billing rollups from the invoices table.
+    Only needed after invoices were written outside the API.
+    """
+    await crud_async.rebuild_invoice_rollups(db)
@@ -1,11 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models
-from ..database import get_db
-from ..schemas.dispensation import Dispensation, DispensationCreate
+from .. import crud, crud_async
+from ..database import get_async_db, get_async_read_db
+from ..export import ExportFormat, export_response
+from ..exceptions import DispensationBatchError, InsufficientStockError, MedicineNotFoundError
+from ..pagination import requested_ids, set_next_cursor
+from ..schemas.dispensation import Dispensation, DispensationCreate, DispensationFilter
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user
+from ..principal import Principal
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/dispensations",
@@ -15,8 +21,8 @@ router = APIRouter(
 
 # Dependency for role checks
 def require_role(allowed_roles: List[str]):
-    def role_checker(current_user: models.staff.Staff = Depends(get_current_user)):
-        if current_user.role.name not in allowed_roles:
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
+        if current_user.role_name not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="The user does not have privileges to perform this action."
@@ -24,13 +30,55 @@ def require_role(allowed_roles: List[str]):
     return role_checker
 
 @router.get("/", response_model=List[Dispensation], dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
-def get_all_dispensations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_dispensations(db, skip=skip, limit=limit)
+async def get_all_dispensations(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: DispensationFilter = Depends(), ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
+    if ids is not None:
+        return trusted_json(await crud_async.get_dispensations_by_ids(db, ids=ids), response)
+    dispensations = await crud_async.get_dispensations(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
+    set_next_cursor(response, dispensations, limit, filters.cursor_keys())
+    return trusted_json(dispensations, response)
+
+@router.get("/changes", response_model=ChangeSet[Dispensation], dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
+async def get_dispensation_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: dispensations created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_dispensation_changes(db, since=since, limit=limit)
+
+@router.get("/export", dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
+async def export_dispensations(format: ExportFormat = "ndjson", filters: DispensationFilter = Depends()):
+    """
+    Stream every dispensation matching the filters as NDJSON or CSV, in constant memory.
+    """
+    return export_response(crud.dispensation_export_query(filters), format, "dispensations")
 
 @router.post("/", response_model=Dispensation, dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
-def create_new_dispensation(dispensation: DispensationCreate, db: Session = Depends(get_db), current_user: models.staff.Staff = Depends(get_current_user)):
-    db_dispensation = crud.create_dispensation(db=db, dispensation=dispensation, staff_id=current_user.id)
+async def create_new_dispensation(dispensation: DispensationCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
+    try:
+        return await crud_async.create_dispensation(db=db, dispensation=dispensation, staff_id=current_user.id)
+    except MedicineNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except InsufficientStockError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+@router.post("/batch", response_model=List[Dispensation], dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
+async def create_dispensation_batch(dispensations: List[DispensationCreate], db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
+    """
+    Dispense every item of a prescription in a single all-or-nothing transaction.
+    Returns one dispensation per item, in request order; on failure nothing is
+    applied and the per-item errors are returned.
+    """
+    try:
+        return await crud_async.create_dispensations_batch(db=db, dispensations=dispensations, staff_id=current_user.id)
+    except DispensationBatchError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=exc.errors)
+
+@router.get("/{dispensation_id}", response_model=Dispensation, dependencies=[Depends(require_role(["Admin", "Doctor", "Pharmacist"]))])
+async def get_dispensation_by_id(dispensation_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a dispensation by ID.
+    """
+    db_dispensation = await crud_async.get_dispensation(db, dispensation_id=dispensation_id)
     if db_dispensation is None:
-        # This could be due to medicine not found or insufficient stock
-        raise HTTPException(status_code=400, detail="Failed to create dispensation. Check medicine ID and stock levels.")
+        raise HTTPException(status_code=404, detail="Dispensation not found")
     return db_dispensation
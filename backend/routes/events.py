@@ -0,0 +1,60 @@
+import asyncio
+import json
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from ..auth import get_current_user_from_request
+from ..events import EVENT_KEEPALIVE_SECONDS, PUSH_COLUMNS, Subscription, event_hub
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Events"],
+    dependencies=[Depends(get_current_user_from_request)]
+)
+
+
+def requested_topics(topics: str = ",".join(PUSH_COLUMNS)) -> List[str]:
+    """Parses `topics=beds,medicines`, rejecting tables that are not pushed."""
+    names = [name.strip() for name in topics.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PUSH_COLUMNS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"topics must be a comma-separated subset of: {', '.join(PUSH_COLUMNS)}")
+    return names
+
+
+async def _event_stream(request: Request, subscription: Subscription):
+    try:
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {change['topic']}\ndata: {json.dumps(change, default=str)}\n\n"
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("/")
+async def stream_events(request: Request, topics: List[str] = Depends(requested_topics)):
+    """
+    Server-Sent Events stream of bed and medicine changes, replacing polling of
+    /beds/ and /medicines/. Each event is named after its table and carries the
+    row's new state (or `deleted: true`) and the table version it was written at.
+    Events for the same row coalesce while a client is behind; a client that falls
+    too far behind receives a `resync` event and should catch up through
+    GET /<resource>/changes?since=<its last token>. Event versions are not
+    tokens: on PostgreSQL concurrent writes may arrive out of version order.
+    Browsers' EventSource cannot send an Authorization header; pass the token
+    as the `access_token` query parameter or cookie instead.
+    """
+    subscription = event_hub.subscribe(topics)
+    return StreamingResponse(
+        _event_stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models
-from ..database import get_db
-from ..schemas.invoice import Invoice, InvoiceCreate, InvoiceUpdate
+from .. import crud, crud_async
+from ..database import get_async_db, get_async_read_db
+from ..export import ExportFormat, export_response
+from ..pagination import requested_ids, set_next_cursor
+from ..schemas.invoice import Invoice, InvoiceCreate, InvoiceFilter, InvoiceUpdate
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user, has_permission
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/invoices",
@@ -14,26 +18,57 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[Invoice], dependencies=[Depends(has_permission("read_invoices"))])
-def get_all_invoices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_invoices(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: InvoiceFilter = Depends(), ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all invoices.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    invoices = crud.get_invoices(db, skip=skip, limit=limit)
-    return invoices
+    if ids is not None:
+        return trusted_json(await crud_async.get_invoices_by_ids(db, ids=ids), response)
+    invoices = await crud_async.get_invoices(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
+    set_next_cursor(response, invoices, limit, filters.cursor_keys())
+    return trusted_json(invoices, response)
+
+@router.get("/changes", response_model=ChangeSet[Invoice], dependencies=[Depends(has_permission("read_invoices"))])
+async def get_invoice_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: invoices created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_invoice_changes(db, since=since, limit=limit)
+
+@router.get("/export", dependencies=[Depends(has_permission("read_invoices"))])
+async def export_invoices(format: ExportFormat = "ndjson", filters: InvoiceFilter = Depends()):
+    """
+    Stream every invoice matching the filters as NDJSON or CSV, in constant memory.
+    """
+    return export_response(crud.invoice_export_query(filters), format, "invoices")
 
 @router.post("/", response_model=Invoice, dependencies=[Depends(has_permission("create_invoice"))])
-def create_new_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
+async def create_new_invoice(invoice: InvoiceCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new invoice.
     """
-    return crud.create_invoice(db=db, invoice=invoice)
+    return await crud_async.create_invoice(db=db, invoice=invoice)
 
 @router.put("/{invoice_id}/status", response_model=Invoice, dependencies=[Depends(has_permission("update_invoice"))])
-def update_invoice_status_by_id(invoice_id: int, invoice_update: InvoiceUpdate, db: Session = Depends(get_db)):
+async def update_invoice_status_by_id(invoice_id: int, invoice_update: InvoiceUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Update an invoice's status.
     """
-    db_invoice = crud.update_invoice_status(db, invoice_id=invoice_id, status=invoice_update.status)
+    db_invoice = await crud_async.update_invoice_status(db, invoice_id=invoice_id, status=invoice_update.status)
+    if db_invoice is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return db_invoice
+
+@router.get("/{invoice_id}", response_model=Invoice, dependencies=[Depends(has_permission("read_invoices"))])
+async def get_invoice_by_id(invoice_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve an invoice by ID.
+    """
+    db_invoice = await crud_async.get_invoice(db, invoice_id=invoice_id)
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return db_invoice
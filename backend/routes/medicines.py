@@ -1,11 +1,18 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import datetime
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models
-from ..database import get_db
-from ..schemas.medicine import Medicine, MedicineCreate, MedicineUpdate, MedicineRestock
+from .. import crud_async
+from ..database import get_async_db, get_async_read_db
+from ..etag import conditional_get
+from ..pagination import requested_ids, set_next_cursor
+from ..exceptions import InsufficientStockError
+from ..schemas.medicine import Medicine, MedicineAdjust, MedicineCreate, MedicineFilter, MedicineRestock, MedicineStockLevel, MedicineUpdate, StockMovement
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user
+from ..principal import Principal
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/medicines",
@@ -15,8 +22,8 @@ router = APIRouter(
 
 # Dependency for role checks
 def require_role(allowed_roles: List[str]):
-    def role_checker(current_user: models.staff.Staff = Depends(get_current_user)):
-        if current_user.role.name not in allowed_roles:
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
+        if current_user.role_name not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="The user does not have privileges to perform this action."
@@ -24,30 +31,92 @@ def require_role(allowed_roles: List[str]):
     return role_checker
 
 @router.get("/", response_model=List[Medicine])
-def get_all_medicines(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_medicines(db, skip=skip, limit=limit)
+async def get_all_medicines(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: MedicineFilter = Depends(), ids: Optional[List[int]] = Depends(requested_ids), versions: Dict[str, int] = Depends(conditional_get("medicines")), db: AsyncSession = Depends(get_async_read_db)):
+    # Cached pages are keyed to the version in the ETag, which another worker's write may have moved
+    version = versions["medicines"]
+    if ids is not None:
+        return trusted_json(await crud_async.get_medicines_by_ids(db, version=version, ids=ids), response)
+    medicines = await crud_async.get_medicines(db, version=version, skip=skip, limit=limit, cursor=cursor, filters=filters)
+    set_next_cursor(response, medicines, limit, filters.cursor_keys())
+    return trusted_json(medicines, response)
+
+@router.get("/changes", response_model=ChangeSet[Medicine])
+async def get_medicine_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: medicines created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_medicine_changes(db, since=since, limit=limit)
 
 @router.post("/", response_model=Medicine, dependencies=[Depends(require_role(["Admin", "Pharmacist"]))])
-def create_new_medicine(medicine: MedicineCreate, db: Session = Depends(get_db)):
-    return crud.create_medicine(db=db, medicine=medicine)
+async def create_new_medicine(medicine: MedicineCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_medicine(db=db, medicine=medicine)
 
 @router.put("/{medicine_id}", response_model=Medicine, dependencies=[Depends(require_role(["Admin", "Pharmacist"]))])
-def update_existing_medicine(medicine_id: int, medicine: MedicineUpdate, db: Session = Depends(get_db)):
-    db_medicine = crud.update_medicine(db, medicine_id=medicine_id, medicine=medicine)
+async def update_existing_medicine(medicine_id: int, medicine: MedicineUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_medicine = await crud_async.update_medicine(db, medicine_id=medicine_id, medicine=medicine)
     if db_medicine is None:
         raise HTTPException(status_code=404, detail="Medicine not found")
     return db_medicine
 
 @router.post("/{medicine_id}/restock", response_model=Medicine, dependencies=[Depends(require_role(["Admin", "Pharmacist"]))])
-def restock_existing_medicine(medicine_id: int, restock: MedicineRestock, db: Session = Depends(get_db)):
-    db_medicine = crud.restock_medicine(db, medicine_id=medicine_id, restock=restock)
+async def restock_existing_medicine(medicine_id: int, restock: MedicineRestock, db: AsyncSession = Depends(get_async_db)):
+    db_medicine = await crud_async.restock_medicine(db, medicine_id=medicine_id, restock=restock)
     if db_medicine is None:
         raise HTTPException(status_code=404, detail="Medicine not found")
     return db_medicine
 
+@router.post("/{medicine_id}/adjust", response_model=Medicine, dependencies=[Depends(require_role(["Admin", "Pharmacist"]))])
+async def adjust_existing_medicine(medicine_id: int, adjustment: MedicineAdjust, db: AsyncSession = Depends(get_async_db)):
+    try:
+        db_medicine = await crud_async.adjust_medicine_stock(db, medicine_id=medicine_id, adjustment=adjustment)
+    except InsufficientStockError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    if db_medicine is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return db_medicine
+
+@router.get("/{medicine_id}/movements", response_model=List[StockMovement])
+async def get_medicine_movements(medicine_id: int, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Page through the stock ledger of a medicine, oldest entry first.
+    """
+    movements = await crud_async.get_stock_movements(db, medicine_id=medicine_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, movements, limit)
+    return trusted_json(movements, response)
+
+@router.get("/{medicine_id}/stock", response_model=MedicineStockLevel)
+async def get_medicine_stock_level(medicine_id: int, at: Optional[datetime.datetime] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Stock level of a medicine at a point in time (now by default), answered from
+    the nearest earlier snapshot plus the ledger entries recorded after it.
+    """
+    at = at or datetime.datetime.utcnow()
+    stock_quantity = await crud_async.get_stock_level_at(db, medicine_id=medicine_id, at=at)
+    if stock_quantity is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return MedicineStockLevel(medicine_id=medicine_id, at=at, stock_quantity=stock_quantity)
+
+@router.post("/snapshots", response_model=dict, dependencies=[Depends(require_role(["Admin"]))])
+async def take_stock_snapshots(db: AsyncSession = Depends(get_async_db)):
+    """
+    Snapshot the stock of every medicine now, in addition to the periodic snapshots.
+    """
+    return {"snapshots_created": await crud_async.create_stock_snapshots(db)}
+
 @router.delete("/{medicine_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_role(["Admin"]))])
-def delete_existing_medicine(medicine_id: int, db: Session = Depends(get_db)):
-    db_medicine = crud.delete_medicine(db, medicine_id=medicine_id)
+async def delete_existing_medicine(medicine_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_medicine = await crud_async.delete_medicine(db, medicine_id=medicine_id)
     if db_medicine is None:
         raise HTTPException(status_code=404, detail="Medicine not found")
     return
+
+@router.get("/{medicine_id}", response_model=Medicine)
+async def get_medicine_by_id(medicine_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a medicine by ID.
+    """
+    db_medicine = await crud_async.get_medicine(db, medicine_id=medicine_id)
+    if db_medicine is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return db_medicine
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from ..auth import get_current_user
+from ..database import async_engine, async_read_engine, engine, pool_status, read_engine
+from ..events import event_hub
+from ..principal import principal_cache
+from ..reference_cache import medicine_cache, role_cache
+from ..stats import dashboard_cache
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(get_current_user)]
+)
+
+@router.get("/", response_model=dict)
+def get_metrics():
+    """
+    Report connection pool utilization, checkout wait times, cache and push event counters.
+    """
+    database = {"primary": pool_status(async_engine), "primary_sync": pool_status(engine)}
+    if async_read_engine is not async_engine:
+        database["replica"] = pool_status(async_read_engine)
+    if read_engine is not engine:
+        database["replica_sync"] = pool_status(read_engine)
+    return {
+        "database": database,
+        "caches": {
+            "principal": principal_cache.stats(),
+            "dashboard": dashboard_cache.stats(),
+            "medicines": medicine_cache.stats(),
+            "roles": role_cache.stats(),
+        },
+        "events": event_hub.stats(),
+    }
@@ -1,11 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud
-from ..database import get_db
-from ..schemas.patient import Patient, PatientCreate
+from .. import crud_async
+from ..database import get_async_db, get_async_read_db
+from ..pagination import requested_ids, set_next_cursor
+from ..patient_import import ImportFormat, detect_format, import_patients_file
+from ..schemas.patient import Patient, PatientCreate, PatientImportReport
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user, has_permission
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/patients",
@@ -15,39 +20,86 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[Patient], dependencies=[Depends(has_permission("read_patients"))])
-def get_all_patients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_patients(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all patients.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    patients = crud.get_patients(db, skip=skip, limit=limit)
-    return patients
+    if ids is not None:
+        return trusted_json(await crud_async.get_patients_by_ids(db, ids=ids), response)
+    patients = await crud_async.get_patients(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, patients, limit)
+    return trusted_json(patients, response)
+
+
+@router.get("/changes", response_model=ChangeSet[Patient], dependencies=[Depends(has_permission("read_patients"))])
+async def get_patient_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: patients created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_patient_changes(db, since=since, limit=limit)
+
+
+@router.get("/search", response_model=List[Patient], dependencies=[Depends(has_permission("read_patients"))])
+async def search_patients(response: Response, q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, gt=0, le=50), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Search patients by name, contact number or email, for autocomplete.
+    Returns the best `limit` matches, prefix matches first.
+    """
+    patients = await crud_async.search_patients(db, q=q.strip(), limit=limit)
+    return trusted_json(patients, response)
 
 
 @router.post("/", response_model=Patient, dependencies=[Depends(has_permission("create_patient"))])
-def create_new_patient(patient: PatientCreate, db: Session = Depends(get_db)):
+async def create_new_patient(patient: PatientCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new patient.
     """
-    return crud.create_patient(db=db, patient=patient)
+    return await crud_async.create_patient(db=db, patient=patient)
+
+
+@router.post("/import", response_model=PatientImportReport, dependencies=[Depends(has_permission("create_patient"))])
+async def import_patients(file: UploadFile = File(...), format: Optional[ImportFormat] = None):
+    """
+    Bulk-import patients from a CSV (with a header row) or NDJSON file.
+    Rows that fail validation or reuse a registered email or contact number are
+    reported and skipped; every other row is loaded. The format defaults to the
+    file extension.
+    """
+    return await run_in_threadpool(import_patients_file, file.file, format or detect_format(file.filename))
 
 
 @router.delete("/{patient_id}", response_model=Patient, dependencies=[Depends(has_permission("delete_patient"))])
-def delete_patient_by_id(patient_id: int, db: Session = Depends(get_db)):
+async def delete_patient_by_id(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a patient by ID.
     """
-    db_patient = crud.delete_patient(db, patient_id=patient_id)
+    db_patient = await crud_async.delete_patient(db, patient_id=patient_id)
     if db_patient is None:
         raise HTTPException(status_code=404, detail="Patient not found")
     return db_patient
 
 
 @router.put("/{patient_id}", response_model=Patient, dependencies=[Depends(has_permission("update_patient"))])
-def update_patient_by_id(patient_id: int, patient: PatientCreate, db: Session = Depends(get_db)):
+async def update_patient_by_id(patient_id: int, patient: PatientCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Update a patient by ID.
     """
-    db_patient = crud.update_patient(db, patient_id=patient_id, patient=patient)
+    db_patient = await crud_async.update_patient(db, patient_id=patient_id, patient=patient)
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return db_patient
+
+
+@router.get("/{patient_id}", response_model=Patient, dependencies=[Depends(has_permission("read_patients"))])
+async def get_patient_by_id(patient_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a patient by ID.
+    """
+    db_patient = await crud_async.get_patient(db, patient_id=patient_id)
     if db_patient is None:
         raise HTTPException(status_code=404, detail="Patient not found")
-    return db_patient
\ No newline at end of file
+    return db_patient
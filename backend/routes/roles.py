@@ -1,11 +1,14 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models
-from ..database import get_db
+from .. import crud_async
+from ..database import get_async_db, get_async_read_db
+from ..pagination import requested_ids, set_next_cursor
 from ..schemas.role import Role, RoleCreate, RoleUpdate
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user, has_permission
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/roles",
@@ -14,39 +17,63 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[Role], dependencies=[Depends(has_permission("read_roles"))])
-def get_all_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_roles(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all roles.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    roles = crud.get_roles(db, skip=skip, limit=limit)
-    return roles
+    if ids is not None:
+        return trusted_json(await crud_async.get_roles_by_ids(db, ids=ids), response)
+    roles = await crud_async.get_roles(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, roles, limit)
+    return trusted_json(roles, response)
+
+@router.get("/changes", response_model=ChangeSet[Role], dependencies=[Depends(has_permission("read_roles"))])
+async def get_role_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: roles created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_role_changes(db, since=since, limit=limit)
 
 @router.post("/", response_model=Role, dependencies=[Depends(has_permission("create_role"))])
-def create_new_role(role: RoleCreate, db: Session = Depends(get_db)):
+async def create_new_role(role: RoleCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new role.
     """
-    db_role = crud.get_role_by_name(db, name=role.name)
+    db_role = await crud_async.get_role_by_name(db, name=role.name)
     if db_role:
         raise HTTPException(status_code=400, detail="Role with this name already exists")
-    return crud.create_role(db=db, role=role)
+    return await crud_async.create_role(db=db, role=role)
 
 @router.put("/{role_id}", response_model=Role, dependencies=[Depends(has_permission("update_role"))])
-def update_existing_role(role_id: int, role: RoleUpdate, db: Session = Depends(get_db)):
+async def update_existing_role(role_id: int, role: RoleUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Update an existing role.
     """
-    db_role = crud.get_role(db, role_id=role_id)
-    if not db_role:
+    db_role = await crud_async.update_role(db=db, role_id=role_id, role=role)
+    if db_role is None:
         raise HTTPException(status_code=404, detail="Role not found")
-    return crud.update_role(db=db, role_id=role_id, role=role)
+    return db_role
 
 @router.delete("/{role_id}", response_model=Role, dependencies=[Depends(has_permission("delete_role"))])
-def delete_existing_role(role_id: int, db: Session = Depends(get_db)):
+async def delete_existing_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete an existing role.
     """
-    db_role = crud.get_role(db, role_id=role_id)
-    if not db_role:
+    db_role = await crud_async.delete_role(db=db, role_id=role_id)
+    if db_role is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+    return db_role
+
+@router.get("/{role_id}", response_model=Role, dependencies=[Depends(has_permission("read_roles"))])
+async def get_role_by_id(role_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a role by ID.
+    """
+    db_role = await crud_async.get_role(db, role_id=role_id)
+    if db_role is None:
         raise HTTPException(status_code=404, detail="Role not found")
-    return crud.delete_role(db=db, role_id=role_id)
+    return db_role
@@ -1,11 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models
-from ..database import get_db
+from .. import crud_async
+from ..database import get_async_db, get_async_read_db
+from ..pagination import requested_ids, set_next_cursor
 from ..schemas.staff import Staff, StaffCreate
+from ..schemas.sync import ChangeSet
 from ..auth import get_current_user, has_permission
+from ..security import get_password_hash_async
+from ..serialization import trusted_json
 
 router = APIRouter(
     prefix="/staff",
@@ -14,43 +18,71 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[Staff], dependencies=[Depends(has_permission("read_staff"))])
-def get_all_staff(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_staff(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, ids: Optional[List[int]] = Depends(requested_ids), db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieve all staff members.
+    Pass the X-Next-Cursor header of a page back as `cursor` for keyset pagination;
+    `skip` remains available for offset pagination.
+    Pass `ids=1,5,9` instead to fetch those records, in that order.
     """
-    staff = crud.get_staff(db, skip=skip, limit=limit)
-    return staff
+    if ids is not None:
+        return trusted_json(await crud_async.get_staff_by_ids(db, ids=ids), response)
+    staff = await crud_async.get_staff(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, staff, limit)
+    return trusted_json(staff, response)
+
+
+@router.get("/changes", response_model=ChangeSet[Staff], dependencies=[Depends(has_permission("read_staff"))])
+async def get_staff_changes(since: Optional[str] = None, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Delta sync: staff members created, updated or deleted after the `since` token.
+    Omit `since` for a full initial sync, then pass back the returned `token`.
+    """
+    return await crud_async.get_staff_changes(db, since=since, limit=limit)
 
 
 @router.post("/", response_model=Staff, dependencies=[Depends(has_permission("create_staff"))])
-def create_new_staff(staff: StaffCreate, db: Session = Depends(get_db)):
+async def create_new_staff(staff: StaffCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new staff member.
     """
     # Check if user already exists
-    db_user = crud.get_staff_by_email(db, email=staff.email)
+    db_user = await crud_async.get_staff_by_email(db, email=staff.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_staff(db=db, staff=staff)
+    hashed_password = await get_password_hash_async(staff.password)
+    return await crud_async.create_staff(db=db, staff=staff, hashed_password=hashed_password)
 
 
 @router.put("/{staff_id}", response_model=Staff, dependencies=[Depends(has_permission("update_staff"))])
-def update_staff_by_id(staff_id: int, staff: StaffCreate, db: Session = Depends(get_db)):
+async def update_staff_by_id(staff_id: int, staff: StaffCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Update a staff member by ID.
     """
-    db_staff = crud.update_staff(db, staff_id=staff_id, staff=staff)
+    hashed_password = await get_password_hash_async(staff.password)
+    db_staff = await crud_async.update_staff(db, staff_id=staff_id, staff=staff, hashed_password=hashed_password)
     if db_staff is None:
         raise HTTPException(status_code=404, detail="Staff member not found")
     return db_staff
 
 
 @router.delete("/{staff_id}", response_model=Staff, dependencies=[Depends(has_permission("delete_staff"))])
-def delete_staff_by_id(staff_id: int, db: Session = Depends(get_db)):
+async def delete_staff_by_id(staff_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a staff member by ID.
     """
-    db_staff = crud.delete_staff(db, staff_id=staff_id)
+    db_staff = await crud_async.delete_staff(db, staff_id=staff_id)
+    if db_staff is None:
+        raise HTTPException(status_code=404, detail="Staff member not found")
+    return db_staff
+
+
+@router.get("/{staff_id}", response_model=Staff, dependencies=[Depends(has_permission("read_staff"))])
+async def get_staff_member_by_id(staff_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Retrieve a staff member by ID.
+    """
+    db_staff = await crud_async.get_staff_member(db, staff_id=staff_id)
     if db_staff is None:
         raise HTTPException(status_code=404, detail="Staff member not found")
-    return db_staff
\ No newline at end of file
+    return db_staff
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import stats
+from ..auth import get_current_user
+from ..database import get_async_read_db
+from ..schemas.stats import DashboardStats
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Statistics"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+@router.get("/dashboard", response_model=DashboardStats)
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Bed occupancy, today's appointments per status, unpaid invoices and low-stock medicines.
+    Served from a short-lived cache shared by all viewers; `generated_at` tells its age.
+    """
+    return await stats.get_dashboard_stats(db)
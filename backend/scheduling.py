@@ -0,0 +1,93 @@
+import datetime
+import os
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .exceptions import AppointmentConflictError
+from .models.appointment import DEFAULT_APPOINTMENT_MINUTES
+
+# --- Scheduling Settings --- #
+# Upper bound on an appointment's length; it bounds how far back an overlap search must look
+MAX_APPOINTMENT_MINUTES = int(os.getenv("MAX_APPOINTMENT_MINUTES", "480"))
+# Widest window the availability search accepts
+MAX_AVAILABILITY_DAYS = int(os.getenv("MAX_AVAILABILITY_DAYS", "31"))
+
+# Appointments in these states no longer occupy the doctor's time
+INACTIVE_STATUSES = ("Cancelled",)
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+
+
+def _busy_intervals(db: Session, doctor_name: str, start: datetime.datetime, end: datetime.datetime,
+                    exclude_id: Optional[int] = None) -> List[Tuple[int, datetime.datetime, datetime.datetime]]:
+    """
+    Returns (id, start, end) of the doctor's active appointments that overlap [start, end).
+
+    An appointment can only overlap when it starts before `end` and no more than
+    MAX_APPOINTMENT_MINUTES before `start`, so the query is a bounded range scan on
+    the (doctor_name, appointment_date) index rather than a scan of the doctor's
+    whole history.
+    """
+    appointment = models.appointment.Appointment
+    query = (
+        select(appointment.id, appointment.appointment_date, appointment.duration_minutes)
+        .where(
+            appointment.doctor_name == doctor_name,
+            appointment.appointment_date < end,
+            appointment.appointment_date > start - datetime.timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+            appointment.status.notin_(INACTIVE_STATUSES),
+        )
+        .order_by(appointment.appointment_date)
+    )
+    if exclude_id is not None:
+        query = query.where(appointment.id != exclude_id)
+    intervals = []
+    for appointment_id, begins, minutes in db.execute(query):
+        ends = begins + datetime.timedelta(minutes=minutes or DEFAULT_APPOINTMENT_MINUTES)
+        if ends > start:
+            intervals.append((appointment_id, begins, ends))
+    return intervals
+
+
+def _lock_doctor_schedule(db: Session, doctor_name: str) -> None:
+    """Serializes bookings for one doctor until the transaction ends (PostgreSQL only)."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(zlib.crc32(doctor_name.encode()))))
+
+
+def ensure_no_conflict(db: Session, doctor_name: str, start: datetime.datetime, duration_minutes: int,
+                       status: Optional[str] = None, exclude_id: Optional[int] = None) -> None:
+    """Raises AppointmentConflictError when the slot overlaps another active appointment."""
+    if status in INACTIVE_STATUSES:
+        return
+    _lock_doctor_schedule(db, doctor_name)
+    end = start + datetime.timedelta(minutes=duration_minutes)
+    conflicts = _busy_intervals(db, doctor_name, start, end, exclude_id=exclude_id)
+    if conflicts:
+        db.rollback()
+        raise AppointmentConflictError(doctor_name, conflicts[0][0])
+
+
+def free_slots(busy: Iterable[Interval], start: datetime.datetime, end: datetime.datetime,
+               min_minutes: int) -> List[Interval]:
+    """Returns the gaps of at least `min_minutes` within [start, end) between sorted busy intervals."""
+    minimum = datetime.timedelta(minutes=min_minutes)
+    slots = []
+    cursor = start
+    for begins, ends in busy:
+        if begins - cursor >= minimum:
+            slots.append((cursor, begins))
+        cursor = max(cursor, ends)
+    if end - cursor >= minimum:
+        slots.append((cursor, end))
+    return slots
+
+
+def get_availability(db: Session, doctor_name: str, start: datetime.datetime, end: datetime.datetime,
+                     min_minutes: int = DEFAULT_APPOINTMENT_MINUTES) -> List[Interval]:
+    busy = [(max(begins, start), min(ends, end)) for _, begins, ends in _busy_intervals(db, doctor_name, start, end)]
+    return free_slots(busy, start, end, min_minutes)
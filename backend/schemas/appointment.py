@@ -1,19 +1,32 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Literal, Optional
 
+from .listing import ListFilter
 from .patient import Patient
+from ..scheduling import DEFAULT_APPOINTMENT_MINUTES, MAX_APPOINTMENT_MINUTES
 
 # Base schema for appointment data
 class AppointmentBase(BaseModel):
     patient_id: int
     doctor_name: str
     appointment_date: datetime
+    duration_minutes: int = DEFAULT_APPOINTMENT_MINUTES
     reason: str
     status: str = "Scheduled"
 
 # Schema for creating a new appointment
 class AppointmentCreate(AppointmentBase):
-    pass
+    duration_minutes: int = Field(default=DEFAULT_APPOINTMENT_MINUTES, gt=0, le=MAX_APPOINTMENT_MINUTES)
+
+# Filter and sort parameters for listing appointments
+class AppointmentFilter(ListFilter):
+    doctor_name: Optional[str] = None
+    patient_id: Optional[int] = None
+    status: Optional[str] = None
+    appointment_date_from: Optional[datetime] = None
+    appointment_date_to: Optional[datetime] = None
+    sort: Literal["id", "appointment_date"] = "id"
 
 # Schema for reading appointment data from the API
 class Appointment(AppointmentBase):
@@ -22,3 +35,8 @@ class Appointment(AppointmentBase):
 
     class Config:
         from_attributes = True
+
+# Schema for a free interval in a doctor's schedule
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
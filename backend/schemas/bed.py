@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
+from .listing import ListFilter
 from .patient import Patient
 
 # Base schema for bed data
@@ -19,6 +20,17 @@ class BedUpdate(BaseModel):
     is_occupied: bool
     patient_id: Optional[int] = None
 
+# Schema for allocating a free bed to a patient, in a given room or any room
+class BedAllocate(BaseModel):
+    patient_id: int
+    room_number: Optional[str] = None
+
+# Filter and sort parameters for listing beds
+class BedFilter(ListFilter):
+    room_number: Optional[str] = None
+    is_occupied: Optional[bool] = None
+    sort: Literal["id", "room_number", "bed_number"] = "id"
+
 # Schema for reading bed data from the API
 class Bed(BedBase):
     id: int
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+import datetime
+
+# Schema for the invoices of one period and status
+class RevenuePeriod(BaseModel):
+    period: datetime.date
+    status: str
+    invoice_count: int
+    amount_total: float
+    running_total: float # cumulative amount of this status up to and including the period
+
+# Schema for the unpaid invoices of one age bucket (days since issue)
+class AgingBucket(BaseModel):
+    bucket: str
+    invoice_count: int
+    amount_total: float
+
+# Schema for reading a patient's billing balance from the API
+class PatientBalance(BaseModel):
+    patient_id: int
+    billed_total: float
+    outstanding_amount: float
+    outstanding_count: int
+
+    class Config:
+        from_attributes = True
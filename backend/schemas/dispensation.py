@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 import datetime
 
+from .listing import ListFilter
+
 from .staff import Staff
 from .patient import Patient
 from .medicine import Medicine
@@ -9,13 +12,22 @@ from .medicine import Medicine
 class DispensationBase(BaseModel):
     patient_id: int
     medicine_id: int
-    quantity_dispensed: int
+    quantity_dispensed: int = Field(gt=0)
     notes: str | None = None
 
 # Schema for creating a new dispensation
 class DispensationCreate(DispensationBase):
     pass
 
+# Filter and sort parameters for listing dispensations
+class DispensationFilter(ListFilter):
+    patient_id: Optional[int] = None
+    medicine_id: Optional[int] = None
+    staff_id: Optional[int] = None
+    date_dispensed_from: Optional[datetime.datetime] = None
+    date_dispensed_to: Optional[datetime.datetime] = None
+    sort: Literal["id", "date_dispensed"] = "id"
+
 # Schema for reading dispensation data from the API
 class Dispensation(DispensationBase):
     id: int
@@ -1,5 +1,8 @@
 from pydantic import BaseModel
+from typing import Literal, Optional
 import datetime
+
+from .listing import ListFilter
 from .patient import Patient # Import Patient schema for nesting
 
 # Base schema for invoice data
@@ -17,6 +20,14 @@ class InvoiceCreate(InvoiceBase):
 class InvoiceUpdate(BaseModel):
     status: str
 
+# Filter and sort parameters for listing invoices
+class InvoiceFilter(ListFilter):
+    status: Optional[str] = None
+    patient_id: Optional[int] = None
+    date_issued_from: Optional[datetime.datetime] = None
+    date_issued_to: Optional[datetime.datetime] = None
+    sort: Literal["id", "date_issued", "amount"] = "id"
+
 # Schema for reading invoice data from the API
 class Invoice(InvoiceBase):
     id: int
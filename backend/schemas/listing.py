@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Literal, Tuple
+
+# Base schema for the filter and sort query parameters of a list endpoint.
+# Fields named after a column filter by equality; the suffixes `_from` (>=),
+# `_to` (<), `_max` (<=) and `_prefix` (starts with) filter the named column.
+class ListFilter(BaseModel):
+    sort: str = "id"
+    order: Literal["asc", "desc"] = "asc"
+
+    def cursor_keys(self) -> Tuple[str, ...]:
+        """Attributes forming the keyset of a page; the id breaks ties in the sort column."""
+        return ("id",) if self.sort == "id" else (self.sort, "id")
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+from typing import Literal, Optional
+import datetime
+
+from .listing import ListFilter
 
 # Base schema for medicine data
 class MedicineBase(BaseModel):
@@ -19,7 +23,26 @@ class MedicineUpdate(BaseModel):
 
 # Schema for restocking a medicine
 class MedicineRestock(BaseModel):
-    quantity_added: int
+    quantity_added: int = Field(gt=0)
+
+# Schema for a manual stock correction (e.g., stocktake, breakage, expiry)
+class MedicineAdjust(BaseModel):
+    quantity_change: int
+    note: str | None = None
+
+    @field_validator("quantity_change")
+    @classmethod
+    def quantity_change_not_zero(cls, value: int) -> int:
+        if value == 0:
+            raise ValueError("quantity_change must not be zero")
+        return value
+
+# Filter and sort parameters for listing medicines
+class MedicineFilter(ListFilter):
+    name_prefix: Optional[str] = None
+    manufacturer: Optional[str] = None
+    stock_quantity_max: Optional[int] = None
+    sort: Literal["id", "name", "stock_quantity"] = "id"
 
 # Schema for reading medicine data from the API
 class Medicine(MedicineBase):
@@ -27,3 +50,23 @@ class Medicine(MedicineBase):
 
     class Config:
         from_attributes = True
+
+
+# Schema for reading stock ledger entries from the API
+class StockMovement(BaseModel):
+    id: int
+    medicine_id: int
+    kind: str
+    quantity: int
+    dispensation_id: int | None = None
+    note: str | None = None
+    created_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
+
+# Schema for a medicine's stock level at a point in time
+class MedicineStockLevel(BaseModel):
+    medicine_id: int
+    at: datetime.datetime
+    stock_quantity: int
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
+from typing import List
 
 # Base schema for patient data
 class PatientBase(BaseModel):
@@ -19,3 +20,16 @@ class Patient(PatientBase):
 
     class Config:
         from_attributes = True
+
+# Schema for one rejected row of a bulk import
+class PatientImportError(BaseModel):
+    row: int # 1-based record number in the file, header excluded
+    error: str
+
+# Schema for the outcome of a bulk import
+class PatientImportReport(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: List[PatientImportError]
+    errors_truncated: bool = False # more rows failed than are listed
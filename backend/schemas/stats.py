@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Dict
+import datetime
+
+# Schema for the summary numbers shown on the dashboard
+class DashboardStats(BaseModel):
+    beds_occupied: int
+    beds_free: int
+    appointments_today: Dict[str, int] # count per status
+    unpaid_invoice_count: int
+    unpaid_invoice_total: float
+    low_stock_medicines: int
+    generated_at: datetime.datetime
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Generic, List, TypeVar
+
+ItemT = TypeVar("ItemT")
+
+# Schema for one batch of a resource's delta-sync feed (GET /<resource>/changes)
+class ChangeSet(BaseModel, Generic[ItemT]):
+    changed: List[ItemT] # created or updated since the given token, oldest write first
+    deleted: List[int] # ids deleted since the given token
+    token: str # opaque; pass back as `since` to fetch the next batch
+    has_more: bool # another batch is already waiting
+
+    class Config:
+        from_attributes = True
@@ -1,11 +1,64 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
+# --- Password Hashing Settings --- #
+
+# Changing the work factor is picked up transparently: older hashes are rehashed on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
 # --- Password Hashing --- #
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS,
+)
+
+# --- Bounded Hashing Pool --- #
+
+class HashingPoolSaturated(Exception):
+    """Raised when the password hashing pool already has as much work queued as it allows."""
+
+
+# bcrypt releases the GIL while hashing, so a small dedicated thread pool keeps the
+# work off the request threadpool without the cost of a process pool.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+
+def _submit(fn, *args) -> Future:
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingPoolSaturated()
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit(pwd_context.verify, plain_password, hashed_password).result()
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit(pwd_context.hash, password).result()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_submit(pwd_context.verify, plain_password, hashed_password))
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifies a password and returns a replacement hash if the stored one uses an outdated work factor."""
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
@@ -0,0 +1,81 @@
+import functools
+import os
+import types
+import typing
+from typing import Any, Callable, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError: # the fast path is optional; responses fall back to FastAPI's encoder
+    orjson = None
+
+# --- Trusted JSON Responses --- #
+
+# List endpoints render their rows straight to JSON bytes instead of validating every
+# row (and its nested objects) through the response model a second time.
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "1") == "1" and orjson is not None
+
+
+def _model_in(annotation) -> tuple:
+    """Returns (schema, is_list) when an annotation holds a schema, optionally in Optional/List."""
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _model_in(args[0]) if len(args) == 1 else (None, False)
+    if origin in (list, typing.List):
+        schema, _ = _model_in(typing.get_args(annotation)[0])
+        return schema, schema is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@functools.lru_cache(maxsize=None)
+def serializer_for(schema: type) -> Callable[[Any], Optional[dict]]:
+    """
+    Compiles a function that copies the fields of `schema` from an ORM object into a dict,
+    recursing into nested schemas. The objects are trusted to already match the schema,
+    as rows loaded by crud do, so nothing is validated or coerced.
+    """
+    plan = []
+    for name, field in schema.model_fields.items():
+        nested, is_list = _model_in(field.annotation)
+        plan.append((name, serializer_for(nested) if nested is not None else None, is_list))
+
+    def serialize(obj):
+        if obj is None:
+            return None
+        data = {}
+        for name, nested, is_list in plan:
+            value = getattr(obj, name)
+            if nested is not None and value is not None:
+                value = [nested(item) for item in value] if is_list else nested(value)
+            data[name] = value
+        return data
+    return serialize
+
+
+class TrustedJSONResponse(Response):
+    """Renders plain dicts and lists with orjson, without validation."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def trusted_json(content: Any, response: Response):
+    """
+    Returns content produced by serializer_for as a TrustedJSONResponse, carrying over
+    the headers (pagination cursor, ETag, ...) set on the injected `response`. With the
+    fast path disabled the content is returned as is, for FastAPI to validate.
+    """
+    if not FAST_JSON_RESPONSES:
+        return content
+    fast = TrustedJSONResponse(content)
+    for name, value in response.headers.items():
+        if name not in ("content-length", "content-type"):
+            fast.headers[name] = value
+    return fast
@@ -0,0 +1,42 @@
+import asyncio
+import datetime
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud_async
+from .cache import TTLCache
+from .schemas.stats import DashboardStats
+
+# --- Dashboard Settings --- #
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "10"))
+# Medicines at or below this stock level count as low stock
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "10"))
+
+# One shared entry: every viewer sees the same numbers for up to the TTL
+dashboard_cache = TTLCache(maxsize=1, ttl=DASHBOARD_CACHE_TTL_SECONDS)
+_dashboard_lock = asyncio.Lock()
+
+_KEY = "dashboard"
+
+
+async def get_dashboard_stats(db: AsyncSession) -> DashboardStats:
+    """
+    Returns the dashboard statistics, recomputing them at most once per TTL.
+    Concurrent requests that miss the cache wait for a single computation
+    instead of each running the aggregate query.
+    """
+    stats = dashboard_cache.get(_KEY)
+    if stats is not None:
+        return stats
+    async with _dashboard_lock:
+        stats = dashboard_cache.get(_KEY)
+        if stats is None:
+            now = datetime.datetime.utcnow()
+            today = datetime.datetime.combine(now.date(), datetime.time.min)
+            values = await crud_async.get_dashboard_stats(
+                db, day_start=today, day_end=today + datetime.timedelta(days=1), low_stock_threshold=LOW_STOCK_THRESHOLD,
+            )
+            stats = DashboardStats(generated_at=now, **values)
+            dashboard_cache.set(_KEY, stats)
+    return stats
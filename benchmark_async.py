@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import crud
+from backend.database import async_engine, engine, get_async_db, get_db, pool_status
+
+# --- Sync vs Async Route Benchmark --- #
+
+def _read_medicines(db: Session, limit: int, delay: float):
+    if delay:
+        # Stands in for a slow query or a distant database
+        db.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+    return len(crud.get_medicines(db, limit=limit))
+
+
+def build_app(limit: int, delay: float) -> FastAPI:
+    """The same read behind a sync route (threadpool + Session) and an async one (event loop + AsyncSession)."""
+    app = FastAPI()
+
+    @app.get("/sync")
+    def read_sync(db: Session = Depends(get_db)):
+        return _read_medicines(db, limit, delay)
+
+    @app.get("/async")
+    async def read_async(db: AsyncSession = Depends(get_async_db)):
+        return await db.run_sync(_read_medicines, limit, delay)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    pending = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient):
+        for _ in pending:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.get(path) # warm up the pool
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main():
+    """
+    Compares the async route stack with the sync one it replaced on the database
+    configured by DATABASE_URL, serving the same medicine listing both ways to
+    `--concurrency` simultaneous clients. The sync route holds a threadpool slot
+    (40 by default) for its whole database wait; the async one only holds a pool
+    connection, so raise DB_POOL_SIZE / DB_MAX_OVERFLOW with the concurrency.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark sync against async database routes.")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per stack")
+    parser.add_argument("--concurrency", type=int, default=200, help="simultaneous clients")
+    parser.add_argument("--limit", type=int, default=20, help="medicines per response")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="pg_sleep added to every request (PostgreSQL only)")
+    args = parser.parse_args()
+    if args.delay_ms and engine.dialect.name != "postgresql":
+        parser.error("--delay-ms needs a PostgreSQL DATABASE_URL")
+
+    app = build_app(args.limit, args.delay_ms / 1000)
+    print(f"{args.requests} requests from {args.concurrency} clients on {engine.dialect.name}, delay {args.delay_ms:g} ms")
+    for stack in ("sync", "async"):
+        result = asyncio.run(run(app, f"/{stack}", args.requests, args.concurrency))
+        pool = pool_status(async_engine if stack == "async" else engine)
+        # Hand the connections back before the other stack opens its own
+        if stack == "sync":
+            engine.dispose()
+        print(
+            f"  {stack:>5}: {result['requests_per_second']:8.0f} req/s   "
+            f"p50 {result['p50_ms']:7.1f} ms   p99 {result['p99_ms']:7.1f} ms   max {result['max_ms']:7.1f} ms   "
+            f"pool {pool}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
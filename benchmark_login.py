@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+from backend import crud
+from backend.database import SessionLocal, engine
+from backend.main import app
+from backend.schemas.role import RoleCreate
+from backend.schemas.staff import StaffCreate
+from backend.security import BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+
+# --- Login Burst Benchmark --- #
+
+PASSWORD = "benchmark-password"
+
+
+def _percentile(latencies: list, fraction: float) -> float:
+    return latencies[max(int(len(latencies) * fraction) - 1, 0)] * 1000 if latencies else float("nan")
+
+
+async def burst(email: str, requests: int, concurrency: int, probe_interval: float) -> dict:
+    """
+    `concurrency` clients log in until `requests` logins were attempted, while a
+    probe requests an unrelated route every `probe_interval` seconds.
+    """
+    logins, rejected, probes = [], [], []
+    pending = iter(range(requests))
+    form = {"username": email, "password": PASSWORD}
+
+    async def client_loop(client: httpx.AsyncClient):
+        for _ in pending:
+            started = time.perf_counter()
+            response = await client.post("/token", data=form)
+            if response.status_code == 503:
+                rejected.append(time.perf_counter() - started)
+                continue
+            response.raise_for_status()
+            logins.append(time.perf_counter() - started)
+
+    async def probe_loop(client: httpx.AsyncClient, done: asyncio.Event):
+        while not done.is_set():
+            started = time.perf_counter()
+            (await client.get("/")).raise_for_status()
+            probes.append(time.perf_counter() - started)
+            await asyncio.sleep(probe_interval)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        done = asyncio.Event()
+        probe = asyncio.create_task(probe_loop(client, done))
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+    for latencies in (logins, rejected, probes):
+        latencies.sort()
+    return {
+        "logins_per_second": len(logins) / elapsed,
+        "rejected": len(rejected),
+        "login_p50_ms": statistics.median(logins) * 1000 if logins else float("nan"),
+        "login_p99_ms": _percentile(logins, 0.99),
+        "rejected_p99_ms": _percentile(rejected, 0.99),
+        "probe_p99_ms": _percentile(probes, 0.99),
+    }
+
+
+def main():
+    """
+    Measures login throughput and latency on the DATABASE_URL database at each
+    `--concurrency` level, with the bcrypt work factor from BCRYPT_ROUNDS. Levels
+    within PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT queue on the hashing
+    pool; above it the excess is shed with 503s. An unrelated route is probed
+    throughout, to show whether the burst stalls the rest of the API.
+    A throwaway role and staff member are created for the run and deleted after.
+    """
+    capacity = PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT
+    parser = argparse.ArgumentParser(description="Benchmark logins with the hashing pool within and beyond capacity.")
+    parser.add_argument("--requests", type=int, default=200, help="login attempts per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[PASSWORD_HASH_WORKERS, 4 * capacity], help="simultaneous clients, one run each")
+    parser.add_argument("--probe-interval-ms", type=float, default=10.0, help="pause between requests to the unrelated route")
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        role = crud.create_role(db, RoleCreate(name=f"Benchmark {tag}", description="Login benchmark"))
+        staff = crud.create_staff(db, StaffCreate(
+            first_name="Login", last_name="Benchmark", email=f"login-benchmark-{tag}@example.test",
+            contact_number=f"login-benchmark-{tag}", role_id=role.id, password=PASSWORD,
+        ))
+        role_id, staff_id, email = role.id, staff.id, staff.email
+
+    print(
+        f"{args.requests} logins per run on {engine.dialect.name}, bcrypt rounds {BCRYPT_ROUNDS}, "
+        f"hashing pool {PASSWORD_HASH_WORKERS} workers + {PASSWORD_HASH_QUEUE_LIMIT} queued"
+    )
+    try:
+        for concurrency in args.concurrency:
+            result = asyncio.run(burst(email, args.requests, concurrency, args.probe_interval_ms / 1000))
+            state = "saturated" if concurrency > capacity else "within pool"
+            print(
+                f"  {concurrency:4d} clients ({state:>11}): {result['logins_per_second']:6.1f} logins/s   "
+                f"p50 {result['login_p50_ms']:7.1f} ms   p99 {result['login_p99_ms']:7.1f} ms   "
+                f"503s {result['rejected']:4d} (p99 {result['rejected_p99_ms']:6.1f} ms)   "
+                f"other routes p99 {result['probe_p99_ms']:6.1f} ms"
+            )
+    finally:
+        with SessionLocal() as db:
+            crud.delete_staff(db, staff_id)
+            crud.delete_role(db, role_id)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
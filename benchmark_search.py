@@ -0,0 +1,160 @@
+import argparse
+import datetime
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import delete, func, select, text
+
+from backend import crud
+from backend.database import SessionLocal, engine
+from backend.db.base import Base
+from backend.models.patient import Patient
+from backend.schemas.patient import PatientCreate
+
+# --- Patient Search Benchmark --- #
+
+# Synthetic patients are recognised (and reused across runs) by this email domain
+EMAIL_DOMAIN = "search-benchmark.test"
+SEED_CHUNK_ROWS = 10_000
+
+_ONSETS = ("b", "br", "c", "ch", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "sh", "t", "v", "w", "z")
+_VOWELS = ("a", "e", "i", "o", "u", "ai", "ea", "ou")
+_CODAS = ("", "n", "r", "s", "l", "m", "ck", "th", "nd", "rt")
+
+
+def _name(rng: random.Random, syllables: int) -> str:
+    return "".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS) for _ in range(syllables)).capitalize()
+
+
+def _patient(rng: random.Random, number: int) -> PatientCreate:
+    first_name, last_name = _name(rng, 2), _name(rng, rng.choice((2, 3)))
+    return PatientCreate(
+        first_name=first_name,
+        last_name=last_name,
+        date_of_birth=datetime.date(1930, 1, 1) + datetime.timedelta(days=rng.randrange(33_000)),
+        contact_number=f"+1555{number:08d}",
+        email=f"{first_name.lower()}.{last_name.lower()}.{number}@{EMAIL_DOMAIN}",
+    )
+
+
+def seed(patients: int, seed_value: int) -> int:
+    """Tops the synthetic patients up to `patients`; returns how many were inserted."""
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count()).select_from(Patient).where(Patient.email.endswith(f"@{EMAIL_DOMAIN}")))
+        if existing >= patients:
+            return 0
+        rng = random.Random(seed_value + existing)
+        for start in range(existing, patients, SEED_CHUNK_ROWS):
+            crud.bulk_insert_patients(db, [_patient(rng, number) for number in range(start, min(start + SEED_CHUNK_ROWS, patients))])
+            print(f"\r  seeded {min(start + SEED_CHUNK_ROWS, patients):,} / {patients:,}", end="", flush=True)
+        print()
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE patients"))
+            db.commit()
+        return patients - existing
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(1, len(word))
+    return word[:position] + word[position + 1:]
+
+
+def queries(count: int, seed_value: int) -> list:
+    """(kind, q) pairs a search box sends: name prefixes, whole names, contact and email prefixes, typos."""
+    with SessionLocal() as db:
+        sample = db.execute(
+            select(Patient.first_name, Patient.last_name, Patient.contact_number, Patient.email)
+            .where(Patient.email.endswith(f"@{EMAIL_DOMAIN}"))
+            .order_by(Patient.id)
+            .limit(10_000)
+        ).all()
+    rng = random.Random(seed_value)
+    kinds = ["name prefix", "whole name", "contact prefix", "email prefix"]
+    if engine.dialect.name == "postgresql":
+        # Only PostgreSQL ranks by trigram similarity; elsewhere a typo simply finds nothing
+        kinds.append("typo")
+    result = []
+    for _ in range(count):
+        first_name, last_name, contact_number, email = rng.choice(sample)
+        kind = rng.choice(kinds)
+        if kind == "name prefix":
+            q = rng.choice((first_name, last_name))[:rng.randint(2, 4)]
+        elif kind == "whole name":
+            q = rng.choice((first_name, last_name))
+        elif kind == "contact prefix":
+            q = contact_number[:rng.randint(7, 10)]
+        elif kind == "email prefix":
+            q = email[:rng.randint(3, 8)]
+        else:
+            q = _typo(last_name, rng)
+        result.append((kind, q))
+    return result
+
+
+def run(searches: list, limit: int) -> dict:
+    latencies = {}
+    with SessionLocal() as db:
+        for kind, q in searches:
+            started = time.perf_counter()
+            crud.search_patients(db, q=q, limit=limit)
+            latencies.setdefault(kind, []).append(time.perf_counter() - started)
+            db.rollback()
+    latencies["all"] = [latency for kind_latencies in latencies.values() for latency in kind_latencies]
+    summary = {}
+    for kind, values in latencies.items():
+        values.sort()
+        summary[kind] = {
+            "count": len(values),
+            "p50_ms": statistics.median(values) * 1000,
+            "p99_ms": values[max(int(len(values) * 0.99) - 1, 0)] * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    return summary
+
+
+def main():
+    """
+    Measures /patients/search latency over `--patients` synthetic patients on the
+    database configured by DATABASE_URL, and fails when the overall p99 misses
+    `--target-p99-ms`. The synthetic patients are kept for later runs unless
+    `--cleanup` is given. Searches run one at a time through crud.search_patients,
+    i.e. the query the route runs, without HTTP and serialization overhead.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark patient search latency over many synthetic patients.")
+    parser.add_argument("--patients", type=int, default=1_000_000, help="synthetic patients to search")
+    parser.add_argument("--searches", type=int, default=2000, help="searches to time")
+    parser.add_argument("--limit", type=int, default=10, help="results per search, as the route's `limit`")
+    parser.add_argument("--target-p99-ms", type=float, default=50.0, help="p99 latency the search must meet")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the synthetic data and searches")
+    parser.add_argument("--cleanup", action="store_true", help="delete the synthetic patients afterwards")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.patients:,} synthetic patients on {engine.dialect.name}")
+    started = time.perf_counter()
+    inserted = seed(args.patients, args.seed)
+    print(f"  inserted {inserted:,} in {time.perf_counter() - started:.0f} s")
+
+    searches = queries(args.searches, args.seed)
+    run(searches[:50], args.limit) # warm up caches and connections
+    summary = run(searches, args.limit)
+    print(f"{args.searches} searches, top {args.limit}:")
+    for kind, stats in summary.items():
+        print(
+            f"  {kind:>14}: {stats['count']:5d}   p50 {stats['p50_ms']:7.2f} ms   "
+            f"p99 {stats['p99_ms']:7.2f} ms   max {stats['max_ms']:7.2f} ms"
+        )
+
+    if args.cleanup:
+        with SessionLocal() as db:
+            db.execute(delete(Patient).where(Patient.email.endswith(f"@{EMAIL_DOMAIN}")))
+            db.commit()
+
+    met = summary["all"]["p99_ms"] <= args.target_p99_ms
+    print(f"p99 {summary['all']['p99_ms']:.2f} ms {'meets' if met else 'MISSES'} the {args.target_p99_ms:g} ms target")
+    return 0 if met else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import datetime
+import statistics
+import sys
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from pydantic import TypeAdapter
+
+from backend import models
+from backend.schemas.dispensation import Dispensation
+from backend.serialization import TrustedJSONResponse, orjson, serializer_for
+
+# --- Response Serialization Microbenchmark --- #
+
+def build_rows(count: int) -> list:
+    """Transient dispensations with their nested patient, medicine and staff (with role), as crud loads them."""
+    role = models.role.Role(id=1, name="Pharmacist", description="Dispenses medicines")
+    staff = models.staff.Staff(
+        id=1, first_name="Phar", last_name="Macist", email="pharmacist@example.test",
+        contact_number="555-0100", role_id=role.id, role=role,
+    )
+    rows = []
+    for number in range(1, count + 1):
+        patient = models.patient.Patient(
+            id=number, first_name="Pat", last_name=f"Ient{number}", date_of_birth=datetime.date(1980, 1, 1),
+            contact_number=f"555-{number:06d}", email=f"patient{number}@example.test",
+        )
+        medicine = models.medicine.Medicine(
+            id=number % 50 + 1, name=f"Medicine {number % 50}", manufacturer="Acme", stock_quantity=100, unit_price=2.5,
+        )
+        rows.append(models.dispensation.Dispensation(
+            id=number, patient_id=patient.id, medicine_id=medicine.id, staff_id=staff.id, quantity_dispensed=1,
+            date_dispensed=datetime.datetime(2024, 1, 1, 9, 30), notes=None,
+            patient=patient, medicine=medicine, staff=staff,
+        ))
+    return rows
+
+
+def build_app(rows: list) -> FastAPI:
+    """The same page behind the response_model path and the trusted path; both declare the same OpenAPI schema."""
+    app = FastAPI()
+    serialize = serializer_for(Dispensation)
+
+    @app.get("/pydantic", response_model=List[Dispensation])
+    async def read_validated():
+        return rows
+
+    @app.get("/trusted", response_model=List[Dispensation])
+    async def read_trusted():
+        return TrustedJSONResponse([serialize(row) for row in rows])
+
+    return app
+
+
+def time_calls(fn, repeat: int) -> list:
+    fn() # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def time_route(app: FastAPI, path: str, repeat: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        (await client.get(path)).raise_for_status() # warm up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            (await client.get(path)).raise_for_status()
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    """
+    Compares the two ways list routes turn ORM rows into JSON, on a page of
+    dispensations with nested patient, medicine and staff: validating through the
+    response model (Pydantic from_attributes), and the trusted path (serializer_for
+    plus orjson). Both are timed as bare encoding and through a FastAPI route.
+    No database is needed.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Pydantic response validation against trusted orjson serialization.")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=50, help="timed pages per variant")
+    args = parser.parse_args()
+    if orjson is None:
+        parser.error("the trusted path needs orjson: pip install orjson")
+
+    rows = build_rows(args.rows)
+    adapter = TypeAdapter(List[Dispensation])
+    serialize = serializer_for(Dispensation)
+    # Both paths must render the same document for the comparison to mean anything
+    if orjson.loads(orjson.dumps([serialize(row) for row in rows])) != orjson.loads(adapter.dump_json(adapter.validate_python(rows, from_attributes=True))):
+        print("The trusted and validated paths render different JSON", file=sys.stderr)
+        return 1
+    variants = {
+        "pydantic encode": time_calls(lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True)), args.repeat),
+        "trusted encode": time_calls(lambda: orjson.dumps([serialize(row) for row in rows]), args.repeat),
+    }
+    app = build_app(rows)
+    for name in ("pydantic", "trusted"):
+        variants[f"{name} route"] = asyncio.run(time_route(app, f"/{name}", args.repeat))
+
+    print(f"{args.rows} dispensations per page, {args.repeat} pages per variant")
+    for name, timings in variants.items():
+        print(f"  {name:>15}: median {statistics.median(timings) * 1000:7.2f} ms   min {min(timings) * 1000:7.2f} ms")
+    for kind in ("encode", "route"):
+        speedup = statistics.median(variants[f"pydantic {kind}"]) / statistics.median(variants[f"trusted {kind}"])
+        print(f"  trusted {kind} is {speedup:.1f}x faster")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
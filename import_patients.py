@@ -0,0 +1,28 @@
+import argparse
+import sys
+
+from backend.patient_import import IMPORT_CHUNK_ROWS, detect_format, import_patients_file
+
+def main():
+    """
+    Bulk-imports patients from a CSV or NDJSON file into the database configured
+    by DATABASE_URL, printing a summary and the rejected rows.
+    """
+    parser = argparse.ArgumentParser(description="Bulk-import patients from a CSV or NDJSON file.")
+    parser.add_argument("path", help="CSV file with a header row, or NDJSON file with one patient per line")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_ROWS, help="rows validated and loaded per batch")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as stream:
+        report = import_patients_file(stream, args.format or detect_format(args.path), chunk_size=args.chunk_size)
+
+    print(f"Received {report.received} rows: imported {report.imported}, rejected {report.failed}.")
+    for error in report.errors:
+        print(f"  row {error.row}: {error.error}")
+    if report.errors_truncated:
+        print(f"  ... and {report.failed - len(report.errors)} more rejected rows.")
+    return 1 if report.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import itertools
+import os
+import tempfile
+
+# The backend reads its settings when imported: point it at a throwaway SQLite
+# database (served through aiosqlite on the async path) and turn off background tasks
+_database_dir = tempfile.mkdtemp(prefix="hms-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["STOCK_SNAPSHOT_INTERVAL_SECONDS"] = "0"
+os.environ["ROLE_MASK_REFRESH_SECONDS"] = "0"
+# Fail any request that issues more statements than this, e.g. an N+1 regression in a listing
+os.environ["SQL_STATEMENT_BUDGET"] = "20"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import crud
+from backend.auth import create_access_token
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models.permission import Permission
+from backend.models.role_permission import RolePermission
+from backend.permissions import PERMISSIONS, refresh_role_mask
+from backend.schemas.role import RoleCreate
+from backend.schemas.staff import StaffCreate
+
+_unique = itertools.count(1)
+
+
+def unique(prefix: str) -> str:
+    """A value no other test uses; the database is shared by the whole session."""
+    return f"{prefix}-{next(_unique)}"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """Bearer headers of a staff member whose Admin role holds every permission."""
+    db = SessionLocal()
+    try:
+        role = crud.create_role(db, RoleCreate(name="Admin", description="All permissions"))
+        for name in PERMISSIONS:
+            permission = Permission(name=name, description=name)
+            db.add(permission)
+            db.flush()
+            db.add(RolePermission(role_id=role.id, permission_id=permission.id))
+        db.commit()
+        refresh_role_mask(db, role.id)
+        crud.create_staff(db, StaffCreate(
+            first_name="Test", last_name="Admin", email="admin@example.test",
+            contact_number="000", role_id=role.id, password="secret",
+        ))
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin@example.test'})}"}
+
+
+@pytest.fixture
+def make_patient(client, auth_headers):
+    def make(**overrides) -> dict:
+        tag = unique("patient")
+        payload = {
+            "first_name": "Pat", "last_name": tag, "date_of_birth": "1980-01-01",
+            "contact_number": tag, "email": f"{tag}@example.test", **overrides,
+        }
+        response = client.post("/patients/", json=payload, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def make_medicine(client, auth_headers):
+    def make(stock_quantity: int = 10, **overrides) -> dict:
+        payload = {
+            "name": unique("medicine"), "manufacturer": "Acme",
+            "stock_quantity": stock_quantity, "unit_price": 2.5, **overrides,
+        }
+        response = client.post("/medicines/", json=payload, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
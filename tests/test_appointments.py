@@ -0,0 +1,24 @@
+from .conftest import unique
+
+
+def _book(client, patient_id, doctor, start, minutes=30):
+    return client.post("/appointments/", json={
+        "patient_id": patient_id, "doctor_name": doctor, "appointment_date": start,
+        "duration_minutes": minutes, "reason": "Checkup",
+    })
+
+
+def test_overlapping_appointments_of_a_doctor_conflict(client, make_patient):
+    patient, doctor = make_patient(), unique("Dr")
+    assert _book(client, patient["id"], doctor, "2030-01-07T10:00:00").status_code == 200
+
+    assert _book(client, patient["id"], doctor, "2030-01-07T10:15:00").status_code == 409
+    assert _book(client, patient["id"], doctor, "2030-01-07T09:45:00").status_code == 409
+
+
+def test_adjacent_and_other_doctors_appointments_do_not_conflict(client, make_patient):
+    patient, doctor = make_patient(), unique("Dr")
+    assert _book(client, patient["id"], doctor, "2030-01-07T10:00:00").status_code == 200
+
+    assert _book(client, patient["id"], doctor, "2030-01-07T10:30:00").status_code == 200
+    assert _book(client, patient["id"], unique("Dr"), "2030-01-07T10:15:00").status_code == 200
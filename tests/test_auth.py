@@ -0,0 +1,58 @@
+import pytest
+from jose import jwt
+
+from backend import auth
+
+from .conftest import unique
+
+
+@pytest.fixture
+def embedded_permissions(monkeypatch):
+    monkeypatch.setattr(auth, "EMBED_PERMISSIONS_IN_TOKEN", True)
+
+
+def _role_id(client, auth_headers, name):
+    roles = client.get("/roles/", headers=auth_headers).json()
+    return next(role["id"] for role in roles if role["name"] == name)
+
+
+def _staff(client, auth_headers, role_id):
+    tag = unique("staff")
+    payload = {
+        "first_name": "Staff", "last_name": tag, "email": f"{tag}@example.test",
+        "contact_number": tag, "role_id": role_id, "password": "secret",
+    }
+    response = client.post("/staff/", json=payload, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json(), payload
+
+
+def _login(client, payload):
+    response = client.post("/token", data={"username": payload["email"], "password": payload["password"]})
+    assert response.status_code == 200, response.text
+    token = response.json()["access_token"]
+    assert "pm" in jwt.get_unverified_claims(token)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_deleted_staff_token_is_rejected(client, auth_headers, embedded_permissions):
+    staff, payload = _staff(client, auth_headers, _role_id(client, auth_headers, "Admin"))
+    headers = _login(client, payload)
+    assert client.get("/staff/", headers=headers).status_code == 200
+
+    assert client.delete(f"/staff/{staff['id']}", headers=auth_headers).status_code == 200
+    assert client.get("/staff/", headers=headers).status_code == 401
+    assert client.post("/roles/", json={"name": unique("role"), "description": "x"}, headers=headers).status_code == 401
+
+
+def test_demoted_staff_token_loses_access(client, auth_headers, embedded_permissions):
+    staff, payload = _staff(client, auth_headers, _role_id(client, auth_headers, "Admin"))
+    headers = _login(client, payload)
+    assert client.get("/staff/", headers=headers).status_code == 200
+
+    role = client.post("/roles/", json={"name": unique("role"), "description": "No permissions"}, headers=auth_headers).json()
+    response = client.put(f"/staff/{staff['id']}", json={**payload, "role_id": role["id"]}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    # Reads check the token's role against the current one; writes reload the staff member
+    assert client.get("/staff/", headers=headers).status_code == 401
+    assert client.post("/roles/", json={"name": unique("role"), "description": "x"}, headers=headers).status_code == 403
@@ -0,0 +1,21 @@
+from backend.bed_allocator import bed_index
+
+from .conftest import unique
+
+
+def test_deleting_a_patient_frees_their_bed(client, auth_headers, make_patient):
+    room = unique("room")
+    bed = client.post("/beds/", json={"bed_number": "1", "room_number": room}, headers=auth_headers).json()
+    patient = make_patient()
+    response = client.post("/beds/allocate", json={"patient_id": patient["id"], "room_number": room}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert bed_index.free_candidates(room) == []
+
+    assert client.delete(f"/patients/{patient['id']}", headers=auth_headers).status_code == 200
+
+    freed = client.get(f"/beds/{bed['id']}", headers=auth_headers).json()
+    assert (freed["is_occupied"], freed["patient_id"]) == (False, None)
+    assert bed_index.free_candidates(room) == [bed["id"]]
+    response = client.post("/beds/allocate", json={"patient_id": make_patient()["id"], "room_number": room}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == bed["id"]
@@ -0,0 +1,35 @@
+from .conftest import unique
+
+
+def _invoice(client, auth_headers, patient_id, amount, status="Unpaid"):
+    payload = {"patient_id": patient_id, "amount": amount, "description": "Consultation", "status": status}
+    response = client.post("/invoices/", json=payload, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _set_status(client, auth_headers, invoice_id, status):
+    response = client.put(f"/invoices/{invoice_id}/status", json={"status": status}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_revenue_leaves_out_statuses_no_invoice_has_anymore(client, auth_headers, make_patient):
+    status = unique("Pending")
+    invoice = _invoice(client, auth_headers, make_patient()["id"], 40.0, status=status)
+    assert len(client.get("/billing/revenue", params={"status": status}, headers=auth_headers).json()) == 1
+
+    _set_status(client, auth_headers, invoice["id"], "Paid")
+
+    assert client.get("/billing/revenue", params={"status": status}, headers=auth_headers).json() == []
+
+
+def test_settled_balances_are_not_listed(client, auth_headers, make_patient):
+    patient_id = make_patient()["id"]
+    # Paying 0.1 and 0.2 off leaves a float residue of about 3e-17 in the running balance
+    invoices = [_invoice(client, auth_headers, patient_id, amount) for amount in (0.1, 0.2)]
+    assert patient_id in [row["patient_id"] for row in client.get("/billing/balances", headers=auth_headers).json()]
+
+    for invoice in invoices:
+        _set_status(client, auth_headers, invoice["id"], "Paid")
+
+    assert patient_id not in [row["patient_id"] for row in client.get("/billing/balances", params={"limit": 1000}, headers=auth_headers).json()]
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.db.base import Base
+from backend.exceptions import InsufficientStockError
+from backend.schemas.dispensation import DispensationCreate
+from backend.schemas.medicine import MedicineCreate
+from backend.schemas.patient import PatientCreate
+from backend.schemas.role import RoleCreate
+from backend.schemas.staff import StaffCreate
+
+# A throwaway PostgreSQL database, e.g. postgresql+psycopg2://postgres@localhost/hms_test;
+# its tables are created and dropped by this module
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="set TEST_POSTGRES_URL to run the PostgreSQL concurrency tests")
+
+WORKERS = 16
+STOCK = 200
+
+
+@pytest.fixture(scope="module")
+def pg_sessions():
+    engine = create_engine(TEST_POSTGRES_URL, pool_size=WORKERS)
+    try:
+        Base.metadata.create_all(engine)
+    except DBAPIError as exc:
+        engine.dispose()
+        pytest.skip(f"cannot create the schema on {engine.url.database}: {exc.orig}")
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def test_concurrent_dispensing_of_one_medicine_never_oversells(pg_sessions):
+    with pg_sessions() as db:
+        patient = crud.create_patient(db, PatientCreate(
+            first_name="Hot", last_name="Path", date_of_birth="1980-01-01",
+            contact_number="hot-path", email="hot-path@example.test",
+        ))
+        role = crud.create_role(db, RoleCreate(name="Pharmacist", description="Dispenses"))
+        staff = crud.create_staff(db, StaffCreate(
+            first_name="Phar", last_name="Macist", email="pharmacist@example.test",
+            contact_number="pharmacist", role_id=role.id, password="secret",
+        ), hashed_password="unused")
+        medicine = crud.create_medicine(db, MedicineCreate(name="Hot", manufacturer="Acme", stock_quantity=STOCK, unit_price=1.0))
+        patient_id, staff_id, medicine_id = patient.id, staff.id, medicine.id
+
+    # Twice the demand the stock can meet, all on the same row
+    attempts_per_worker = 2 * STOCK // WORKERS
+    dispensed, rejected, failures = [], [], []
+    start = threading.Barrier(WORKERS)
+
+    def pharmacist():
+        item = DispensationCreate(patient_id=patient_id, medicine_id=medicine_id, quantity_dispensed=1)
+        with pg_sessions() as db:
+            start.wait()
+            for _ in range(attempts_per_worker):
+                try:
+                    crud.create_dispensation(db, item, staff_id)
+                    dispensed.append(1)
+                except InsufficientStockError:
+                    rejected.append(1)
+                except Exception as exc: # surfaced by the assertions below
+                    failures.append(exc)
+                    db.rollback()
+
+    threads = [threading.Thread(target=pharmacist) for _ in range(WORKERS)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    with pg_sessions() as db:
+        stock = db.execute(text("SELECT stock_quantity FROM medicines WHERE id = :id"), {"id": medicine_id}).scalar_one()
+        rows = db.execute(text("SELECT count(*) FROM dispensations WHERE medicine_id = :id"), {"id": medicine_id}).scalar_one()
+        ledger = db.execute(text("SELECT -sum(quantity) FROM stock_movements WHERE medicine_id = :id AND kind = 'dispense'"), {"id": medicine_id}).scalar_one()
+
+    assert failures == []
+    assert len(dispensed) == STOCK
+    assert len(rejected) == WORKERS * attempts_per_worker - STOCK
+    assert stock == 0
+    assert rows == ledger == STOCK
+    print(f"\n{WORKERS} workers, {WORKERS * attempts_per_worker} attempts on one medicine: "
+          f"{WORKERS * attempts_per_worker / elapsed:.0f} attempts/s, {STOCK / elapsed:.0f} dispensations/s")
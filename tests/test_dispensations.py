@@ -0,0 +1,49 @@
+def _stock(client, auth_headers, medicine_id):
+    return client.get(f"/medicines/{medicine_id}", headers=auth_headers).json()["stock_quantity"]
+
+
+def test_dispensing_more_than_the_stock_is_rejected(client, auth_headers, make_patient, make_medicine):
+    patient, medicine = make_patient(), make_medicine(stock_quantity=5)
+    item = {"patient_id": patient["id"], "medicine_id": medicine["id"], "quantity_dispensed": 3}
+
+    assert client.post("/dispensations/", json=item, headers=auth_headers).status_code == 200
+    response = client.post("/dispensations/", json=item, headers=auth_headers)
+
+    assert response.status_code == 409
+    assert _stock(client, auth_headers, medicine["id"]) == 2
+
+
+def test_dispensing_an_unknown_medicine_is_not_found(client, auth_headers, make_patient):
+    item = {"patient_id": make_patient()["id"], "medicine_id": 999999, "quantity_dispensed": 1}
+    assert client.post("/dispensations/", json=item, headers=auth_headers).status_code == 404
+
+
+def test_batch_is_all_or_nothing(client, auth_headers, make_patient, make_medicine):
+    patient = make_patient()
+    available, short = make_medicine(stock_quantity=10), make_medicine(stock_quantity=1)
+    batch = [
+        {"patient_id": patient["id"], "medicine_id": available["id"], "quantity_dispensed": 4},
+        {"patient_id": patient["id"], "medicine_id": short["id"], "quantity_dispensed": 2},
+    ]
+
+    response = client.post("/dispensations/batch", json=batch, headers=auth_headers)
+
+    assert response.status_code == 409
+    assert _stock(client, auth_headers, available["id"]) == 10
+    assert _stock(client, auth_headers, short["id"]) == 1
+
+
+def test_batch_dispenses_every_item(client, auth_headers, make_patient, make_medicine):
+    patient = make_patient()
+    first, second = make_medicine(stock_quantity=10), make_medicine(stock_quantity=10)
+    batch = [
+        {"patient_id": patient["id"], "medicine_id": first["id"], "quantity_dispensed": 4},
+        {"patient_id": patient["id"], "medicine_id": second["id"], "quantity_dispensed": 10},
+    ]
+
+    response = client.post("/dispensations/batch", json=batch, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert [item["medicine_id"] for item in response.json()] == [first["id"], second["id"]]
+    assert _stock(client, auth_headers, first["id"]) == 6
+    assert _stock(client, auth_headers, second["id"]) == 0
@@ -0,0 +1,29 @@
+def test_unchanged_listing_is_not_modified(client, auth_headers, make_medicine):
+    make_medicine()
+    first = client.get("/medicines/", headers=auth_headers)
+    etag = first.headers["ETag"]
+
+    second = client.get("/medicines/", headers={**auth_headers, "If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert second.content == b""
+
+
+def test_a_write_changes_the_etag_and_the_body(client, auth_headers, make_medicine):
+    medicine = make_medicine(stock_quantity=1)
+    etag = client.get("/medicines/", headers=auth_headers).headers["ETag"]
+
+    client.post(f"/medicines/{medicine['id']}/restock", json={"quantity_added": 4}, headers=auth_headers)
+    response = client.get("/medicines/", headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert {row["id"]: row["stock_quantity"] for row in response.json()}[medicine["id"]] == 5
+
+
+def test_etag_depends_on_the_query(client, auth_headers, make_medicine):
+    make_medicine()
+    all_rows = client.get("/medicines/", headers=auth_headers).headers["ETag"]
+    one_row = client.get("/medicines/", params={"limit": 1}, headers=auth_headers).headers["ETag"]
+    assert all_rows != one_row
@@ -0,0 +1,71 @@
+import pytest
+
+from backend import crud
+from backend.database import SessionLocal
+from backend.models.medicine import Medicine
+from backend.pagination import NEXT_CURSOR_HEADER, encode_cursor, next_cursor
+from backend.schemas.medicine import MedicineFilter
+
+from .conftest import unique
+
+
+def test_cursor_pages_cover_every_row_once(client, auth_headers, make_medicine):
+    manufacturer = unique("maker")
+    ids = [make_medicine(manufacturer=manufacturer)["id"] for _ in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"manufacturer": manufacturer, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/medicines/", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [medicine["id"] for medicine in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert seen == ids
+
+
+def test_cursor_pages_follow_the_sort_key(client, auth_headers, make_medicine):
+    manufacturer = unique("maker")
+    stocks = [30, 10, 20, 10]
+    for stock in stocks:
+        make_medicine(manufacturer=manufacturer, stock_quantity=stock)
+    params = {"manufacturer": manufacturer, "sort": "stock_quantity", "limit": 3}
+
+    first = client.get("/medicines/", params=params, headers=auth_headers)
+    second = client.get("/medicines/", params={**params, "cursor": first.headers[NEXT_CURSOR_HEADER]}, headers=auth_headers)
+
+    assert [medicine["stock_quantity"] for medicine in first.json() + second.json()] == sorted(stocks)
+
+
+def test_malformed_or_mistyped_cursors_are_rejected(client, auth_headers):
+    assert client.get("/medicines/", params={"cursor": "not-a-cursor"}, headers=auth_headers).status_code == 400
+    # Well-formed, but a string where the stock_quantity key needs an integer
+    cursor = encode_cursor(["x", 1])
+    assert client.get("/medicines/", params={"cursor": cursor, "sort": "stock_quantity"}, headers=auth_headers).status_code == 400
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_pages_include_rows_with_a_null_sort_key(make_medicine, order):
+    manufacturer = unique("maker")
+    ids = [make_medicine(manufacturer=manufacturer, stock_quantity=stock)["id"] for stock in (20, 0, 10, 0, 30)]
+    # Legacy rows from before stock_quantity was required
+    with SessionLocal() as db:
+        db.query(Medicine).filter(Medicine.stock_quantity == 0, Medicine.id.in_(ids)).update({"stock_quantity": None})
+        db.commit()
+
+    filters = MedicineFilter(manufacturer=manufacturer, sort="stock_quantity", order=order)
+    pages, cursor = [], None
+    with SessionLocal() as db:
+        while True:
+            page = crud.get_medicines(db, limit=2, cursor=cursor, filters=filters)
+            pages += [(medicine.stock_quantity, medicine.id) for medicine in page]
+            cursor = next_cursor(page, 2, filters.cursor_keys())
+            if cursor is None:
+                break
+
+    stocked = sorted(key for key in pages if key[0] is not None)
+    nulls = sorted(key for key in pages if key[0] is None)
+    assert pages == (stocked if order == "asc" else stocked[::-1]) + (nulls if order == "asc" else nulls[::-1])
+    assert sorted(id_ for _, id_ in pages) == ids
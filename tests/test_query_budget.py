@@ -0,0 +1,42 @@
+import pytest
+
+from backend import query_budget
+from backend.query_budget import STATEMENT_COUNT_HEADER, StatementBudgetExceeded
+
+from .conftest import unique
+
+
+@pytest.fixture
+def nested_rows(client, auth_headers, make_patient, make_medicine):
+    """More rows per listing than the budget allows per-row loads for, each with its own nested patient and medicine."""
+    doctor = unique("Dr")
+    for hour in range(8, 18):
+        patient, medicine = make_patient(), make_medicine()
+        item = {"patient_id": patient["id"], "medicine_id": medicine["id"], "quantity_dispensed": 1}
+        assert client.post("/dispensations/", json=item, headers=auth_headers).status_code == 200
+        appointment = {
+            "patient_id": patient["id"], "doctor_name": doctor, "appointment_date": f"2031-02-03T{hour:02d}:00:00",
+            "duration_minutes": 30, "reason": "Checkup",
+        }
+        assert client.post("/appointments/", json=appointment).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/dispensations/", "/staff/", "/appointments/"])
+def test_nested_listings_stay_within_the_statement_budget(client, auth_headers, nested_rows, path):
+    response = client.get(path, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) >= 1
+    assert int(response.headers[STATEMENT_COUNT_HEADER]) <= query_budget.SQL_STATEMENT_BUDGET
+
+
+def test_a_request_over_the_statement_budget_fails(client, auth_headers, monkeypatch):
+    tag = unique("patient")
+    patient = {
+        "first_name": "Pat", "last_name": tag, "date_of_birth": "1980-01-01",
+        "contact_number": tag, "email": f"{tag}@example.test",
+    }
+    # Creating a patient takes an INSERT and a version bump at least
+    monkeypatch.setattr(query_budget, "SQL_STATEMENT_BUDGET", 1)
+    with pytest.raises(StatementBudgetExceeded):
+        client.post("/patients/", json=patient, headers=auth_headers)
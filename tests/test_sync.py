@@ -0,0 +1,53 @@
+def _sync(client, auth_headers, since=None, limit=100):
+    """Follows /patients/changes to its end; returns (changed ids, deleted ids, batches, token)."""
+    changed, deleted, batches = [], [], 0
+    while True:
+        params = {"limit": limit, **({"since": since} if since is not None else {})}
+        response = client.get("/patients/changes", params=params, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        changed += [patient["id"] for patient in body["changed"]]
+        deleted += body["deleted"]
+        batches += 1
+        since = body["token"]
+        if not body["has_more"]:
+            return changed, deleted, batches, since
+
+
+def test_changes_after_a_token_are_only_the_new_writes(client, auth_headers, make_patient):
+    *_, token = _sync(client, auth_headers)
+    created = [make_patient() for _ in range(3)]
+    updated = {**created[0], "first_name": "Renamed"}
+    assert client.put(f"/patients/{updated['id']}", json={k: v for k, v in updated.items() if k != "id"}, headers=auth_headers).status_code == 200
+    assert client.delete(f"/patients/{created[1]['id']}", headers=auth_headers).status_code == 200
+
+    changed, deleted, _, token = _sync(client, auth_headers, since=token)
+
+    assert sorted(changed) == sorted([created[2]["id"], created[0]["id"]])
+    assert deleted == [created[1]["id"]]
+    assert _sync(client, auth_headers, since=token)[:2] == ([], [])
+
+
+def test_a_batch_can_end_inside_one_write(client, auth_headers):
+    *_, token = _sync(client, auth_headers)
+    rows = "first_name,last_name,date_of_birth,contact_number,email\n" + "".join(
+        f"Bulk,Row{i},1990-01-01,bulk-{i},bulk-{i}@example.test\n" for i in range(5)
+    )
+    # The import loads all five rows in one transaction, so they share one version
+    response = client.post("/patients/import", files={"file": ("patients.csv", rows, "text/csv")}, headers=auth_headers)
+    assert response.json()["imported"] == 5
+
+    changed, _, batches, _ = _sync(client, auth_headers, since=token, limit=2)
+
+    assert len(changed) == len(set(changed)) == 5
+    assert batches == 3
+
+
+def test_integer_tokens_of_older_clients_are_accepted(client, auth_headers, make_patient):
+    patient = make_patient()
+    response = client.get("/patients/changes", params={"since": "-1"}, headers=auth_headers)
+    assert patient["id"] in [row["id"] for row in response.json()["changed"]]
+
+
+def test_malformed_tokens_are_rejected(client, auth_headers):
+    assert client.get("/patients/changes", params={"since": "garbage"}, headers=auth_headers).status_code == 400
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from backend.database import async_engine
+
+from .conftest import unique
+
+
+@pytest.fixture
+def statements():
+    """SQL statements the app issues while the fixture is active, in order."""
+    issued = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        issued.append(" ".join(statement.split()))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield issued
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def _on_row(statements, table):
+    # Statements addressing one row by primary key; the version stamp (id IN ...)
+    # and reads of other rows, e.g. the appointment overlap check, are not counted
+    pattern = re.compile(rf"\bWHERE {table}\.id = \?")
+    return [statement for statement in statements if pattern.search(statement)]
+
+
+def _request(client, auth_headers, statements, method, path, **kwargs):
+    # Warm the principal cache, which staff and role writes clear, so only the write is recorded
+    client.get("/roles/", headers=auth_headers)
+    statements.clear()
+    response = client.request(method, path, headers=auth_headers, **kwargs)
+    assert response.status_code in (200, 204), response.text
+    return response
+
+
+def _assert_one_returning_write(statements, table, verb):
+    on_row = _on_row(statements, table)
+    assert on_row, statements
+    # Not preceded by a read of the row: the write itself returns it
+    assert on_row[0].startswith(verb) and "RETURNING" in on_row[0], on_row
+    assert sum(statement.startswith(verb) for statement in on_row) == 1, on_row
+
+
+def _row_and_update(client, auth_headers, make_patient, make_medicine, table):
+    """Creates a row of the table and returns its id with a PUT payload for it."""
+    if table == "patients":
+        tag = unique("patient")
+        update = {
+            "first_name": "Pat", "last_name": tag, "date_of_birth": "1980-01-01",
+            "contact_number": tag, "email": f"{tag}@example.test",
+        }
+        return make_patient()["id"], update
+    if table == "medicines":
+        return make_medicine(stock_quantity=0)["id"], {"unit_price": 3.0}
+    if table == "beds":
+        bed = client.post("/beds/", json={"bed_number": "1", "room_number": unique("room")}, headers=auth_headers).json()
+        return bed["id"], {"is_occupied": True}
+    if table == "appointments":
+        appointment = client.post("/appointments/", json={
+            "patient_id": make_patient()["id"], "doctor_name": unique("Dr"),
+            "appointment_date": "2032-03-04T10:00:00", "reason": "Checkup",
+        }).json()
+        return appointment["id"], {**appointment, "reason": "Follow-up"}
+    role = client.post("/roles/", json={"name": unique("role"), "description": "x"}, headers=auth_headers).json()
+    return role["id"], {"name": unique("role"), "description": "y"}
+
+
+@pytest.mark.parametrize("table", ["patients", "medicines", "beds", "appointments", "roles"])
+def test_update_and_delete_each_issue_one_returning_statement(client, auth_headers, make_patient, make_medicine, statements, table):
+    row_id, update = _row_and_update(client, auth_headers, make_patient, make_medicine, table)
+
+    _request(client, auth_headers, statements, "PUT", f"/{table}/{row_id}", json=update)
+    _assert_one_returning_write(statements, table, "UPDATE")
+
+    _request(client, auth_headers, statements, "DELETE", f"/{table}/{row_id}")
+    _assert_one_returning_write(statements, table, "DELETE")